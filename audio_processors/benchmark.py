@@ -0,0 +1,230 @@
+# audio_processors/benchmark.py
+"""Headless transcription throughput benchmark
+
+Runs WhisperProcessor over a fixed corpus for every combination of the
+given settings and prints JSON with the real-time factor, peak RSS (of
+the run and of its largest chunk worker), segments per second and time
+to first segment of each run. Every combination runs in a fresh
+process, so peak RSS and model loading are measured in isolation.
+
+Usage:
+    python -m audio_processors.benchmark --models base small --batch-sizes 0 16
+    python -m audio_processors.benchmark --audio talk.mp3 --beam-sizes 5 1 --output results.json
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import ffmpeg
+
+# Read by ffmpeg's flite speech synthesizer, needs ffmpeg built with libflite
+SPEECH_TEXT = (
+    "The river runs past the old mill and into the town. "
+    "Every morning the baker opens his shop before the sun comes up. "
+    "Children walk to school along the water and stop to watch the boats. "
+    "In the evening the streets are quiet and the lights come on one by one."
+)
+
+
+def speech_source(seconds: float, pause: float = 1.0, noise: float = 0.0) -> str:
+    """ffmpeg lavfi graph of synthesized English speech, looped with pauses"""
+    speech = (f"flite=text='{SPEECH_TEXT}':voice=slt,apad=pad_dur={pause},"
+              f"aloop=loop=-1:size={16000 * 120},atrim=duration={seconds}")
+    if not noise:
+        return speech
+    return (f"{speech}[speech];anoisesrc=d={seconds}:c=pink:a={noise}[noise];"
+            f"[speech][noise]amix=inputs=2:duration=first[out0]")
+
+
+# Generated corpus: name -> ffmpeg lavfi source. English speech with
+# short pauses, long pauses for the VAD to skip, and background noise.
+CORPUS = {
+    'speech_60s': speech_source(60),
+    'speech_pauses_120s': speech_source(120, pause=8.0),
+    'speech_noise_300s': speech_source(300, pause=2.0, noise=0.02),
+}
+
+
+def generate_corpus(corpus_dir: str = "./cache/benchmark_corpus") -> List[str]:
+    """Create the corpus files with ffmpeg, once"""
+    corpus_dir = Path(corpus_dir)
+    corpus_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for name, source in CORPUS.items():
+        path = corpus_dir / f"{name}.mp3"
+        if not path.exists():
+            print(f"Generating {path}", file=sys.stderr)
+            try:
+                (
+                    ffmpeg.input(source, f='lavfi')
+                    .output(str(path), acodec='libmp3lame', ac=1, ar=16000, ab='64k')
+                    .overwrite_output()
+                    .run(capture_stdout=True, capture_stderr=True)
+                )
+            except ffmpeg.Error as e:
+                raise Exception(
+                    f"Could not synthesize the benchmark corpus, pass recordings with --audio "
+                    f"or use an ffmpeg built with libflite: {e.stderr.decode('utf8', errors='replace')}")
+        paths.append(str(path))
+    return paths
+
+
+def peak_rss_bytes(children: bool = False) -> int:
+    """Peak resident set size of this process, None where unsupported
+
+    With children, the peak of the largest finished child process, such
+    as a chunk worker.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # Linux reports KiB
+
+
+def run_config(config: Dict, audio_paths: List[str], language: str) -> Dict:
+    """Transcribe the corpus with one combination of settings, in a worker process"""
+    # Keep stdout for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        return measure(config, audio_paths, language)
+
+
+def measure(config: Dict, audio_paths: List[str], language: str) -> Dict:
+    """Time one config over every file"""
+    from .parallel import probe_duration
+    from .whisper import WhisperProcessor
+
+    processor = WhisperProcessor(
+        model_size=config['model_size'],
+        compute_type=config['compute_type'],
+        cpu_threads=config['cpu_threads'],
+        num_workers=config.get('num_workers', 1),
+        chunk_length=config.get('chunk_length', 120.0),
+        language=language,
+        vad_options={'enabled': config['vad']},
+        batch_size=config['batch_size'],
+        batched_min_duration=0.0
+    )
+    processor.decode_options['beam_size'] = config['beam_size']
+
+    start = time.perf_counter()
+    processor.model  # Load outside the timed runs
+    load_seconds = time.perf_counter() - start
+    if config.get('warmup') and processor.num_workers > 1:
+        # Start the chunk workers, which load their own models, untimed too
+        executor = processor.get_parallel().get_executor()
+        list(executor.map(time.sleep, [0.5] * processor.num_workers))
+
+    files = []
+    for audio_path in audio_paths:
+        duration = probe_duration(audio_path)
+        first_segment = None
+        segments = 0
+        start = time.perf_counter()
+        for _ in processor.stream(audio_path):
+            if first_segment is None:
+                first_segment = time.perf_counter() - start
+            segments += 1
+        elapsed = time.perf_counter() - start
+        files.append({
+            'audio': Path(audio_path).name,
+            'audio_seconds': round(duration, 2),
+            'seconds': round(elapsed, 3),
+            'rtf': round(elapsed / duration, 4) if duration else None,
+            'segments': segments,
+            'segments_per_second': round(segments / elapsed, 2) if elapsed else None,
+            'time_to_first_segment': round(first_segment, 3) if first_segment is not None else None
+        })
+
+    audio_seconds = sum(f['audio_seconds'] for f in files)
+    seconds = sum(f['seconds'] for f in files)
+    segments = sum(f['segments'] for f in files)
+    if processor.parallel is not None:
+        processor.parallel.close(wait=True)  # Chunk workers count once they exited
+    processor.close()
+    return {
+        'config': config,
+        'load_seconds': round(load_seconds, 3),
+        'rtf': round(seconds / audio_seconds, 4) if audio_seconds else None,
+        'segments_per_second': round(segments / seconds, 2) if seconds else None,
+        'peak_rss_bytes': peak_rss_bytes(),
+        'peak_worker_rss_bytes': peak_rss_bytes(children=True),
+        'vad_skipped_ratio': round(processor.vad_stats.get_stats()['skipped_ratio'], 3),
+        'files': files
+    }
+
+
+def benchmark(audio_paths: List[str], configs: List[Dict], language: str = "ja") -> Dict:
+    """Run every config over the corpus, each in its own process"""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for config in configs:
+        print(f"Benchmarking {config}", file=sys.stderr)
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            try:
+                result = executor.submit(run_config, config, audio_paths, language).result()
+            except Exception as e:
+                result = {'config': config, 'error': str(e)}
+        print(f"  RTF {result.get('rtf')}  peak RSS {result.get('peak_rss_bytes')}", file=sys.stderr)
+        results.append(result)
+
+    return {
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version()
+        },
+        'language': language,
+        'corpus': [Path(path).name for path in audio_paths],
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--audio', nargs='+', help="Audio files to use instead of the generated corpus")
+    parser.add_argument('--corpus-dir', default="./cache/benchmark_corpus")
+    parser.add_argument('--language', default="en", help="Language of the audio, the generated corpus is English")
+    parser.add_argument('--models', nargs='+', default=["base"])
+    parser.add_argument('--compute-types', nargs='+', default=["int8"])
+    parser.add_argument('--beam-sizes', type=int, nargs='+', default=[5])
+    parser.add_argument('--cpu-threads', type=int, nargs='+', default=[0])
+    parser.add_argument('--num-workers', type=int, nargs='+', default=[1],
+                        help="Chunk worker processes, only used for files over twice the chunk length")
+    parser.add_argument('--vad', choices=['on', 'off', 'both'], default='on')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[0],
+                        help="0 decodes sequentially")
+    parser.add_argument('--output', help="Write the JSON here instead of stdout")
+    args = parser.parse_args()
+
+    audio_paths = args.audio or generate_corpus(args.corpus_dir)
+    vad = {'on': [True], 'off': [False], 'both': [True, False]}[args.vad]
+    configs = [
+        {'model_size': model, 'compute_type': compute_type, 'beam_size': beam_size,
+         'cpu_threads': cpu_threads, 'num_workers': num_workers, 'vad': vad_enabled,
+         'batch_size': batch_size}
+        for model, compute_type, beam_size, cpu_threads, num_workers, vad_enabled, batch_size
+        in itertools.product(args.models, args.compute_types, args.beam_sizes, args.cpu_threads,
+                             args.num_workers, vad, args.batch_sizes)
+    ]
+
+    report = json.dumps(benchmark(audio_paths, configs, args.language), indent=2)
+    if args.output:
+        Path(args.output).write_text(report, encoding='utf-8')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
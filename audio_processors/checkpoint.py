@@ -0,0 +1,91 @@
+# audio_processors/checkpoint.py
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List
+
+
+class CheckpointWriter:
+    """Appends finished segments of a running job to its checkpoint file"""
+
+    def __init__(self, path: Path):
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def append(self, segment: Dict):
+        """Record one segment durably, before it is handed on
+
+        Cards are created from every segment that leaves the processor,
+        so a segment missing from the checkpoint after a crash would be
+        decoded again under a new id and duplicate its card.
+        """
+        self.file.write(json.dumps(segment, ensure_ascii=False) + '\n')
+        self.flush()
+
+    def flush(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        """Flush and close the file, the checkpoint stays for a later resume"""
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+
+class TranscriptCheckpoints:
+    """Partial transcripts of unfinished jobs
+
+    Each job appends its finished segments, one JSON line each, to a file
+    named by its transcript cache key. A job started again for the same
+    audio and settings reloads them and resumes decoding at the end of the
+    last one. Checkpoints are removed when their job completes, and
+    abandoned ones after max_age_days.
+    """
+
+    def __init__(self, checkpoint_dir: str = "./cache/checkpoints", max_age_days: float = 30.0):
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        self.prune(max_age_days)
+
+    def path(self, key: str) -> Path:
+        """File holding the checkpoint for a key"""
+        return self.checkpoint_dir / f"{key}.jsonl"
+
+    def load(self, key: str) -> List[Dict]:
+        """Segments checkpointed so far, empty if there is no checkpoint"""
+        path = self.path(key)
+        if not path.exists():
+            return []
+        segments = []
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break  # Torn write at the end of a crashed job
+                try:
+                    segments.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        # Keep only the valid prefix, even if that is nothing, so appends
+        # continue from a clean end
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(segment, ensure_ascii=False) + '\n' for segment in segments)
+        return segments
+
+    def open(self, key: str) -> CheckpointWriter:
+        """Writer appending to a key's checkpoint"""
+        return CheckpointWriter(self.path(key))
+
+    def discard(self, key: str):
+        """Remove a key's checkpoint"""
+        self.path(key).unlink(missing_ok=True)
+
+    def prune(self, max_age_days: float):
+        """Remove checkpoints untouched for max_age_days"""
+        cutoff = time.time() - max_age_days * 86400
+        for path in self.checkpoint_dir.glob('*.jsonl'):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                continue
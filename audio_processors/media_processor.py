@@ -4,15 +4,35 @@ from pathlib import Path
 import yt_dlp
 import requests
 import feedparser
-from .whisper import WhisperProcessor
+from .transcription_worker import TranscriptionService
+from .pcm_cache import PcmCache
 import ffmpeg  # Add this import
 import shutil
 
 class MediaProcessor:
-    def __init__(self, download_dir: str = "./downloads"):
+    def __init__(self, download_dir: str = "./downloads", cache_dir: str = "./cache/transcripts",
+                 cache_max_entries: int = 200, cache_max_bytes: int = 200 * 1024 * 1024,
+                 num_workers: int = 1, cpu_threads: int = 0, vad_options: Dict = None,
+                 batch_size: int = 0, model_size: str = "base", compute_type: str = "int8",
+                 refine_model: str = None, checkpoint_dir: str = "./cache/checkpoints",
+                 pcm_dir: str = "./cache/pcm"):
         self.download_dir = Path(download_dir)
         self.download_dir.mkdir(parents=True, exist_ok=True)
-        self.whisper = WhisperProcessor()
+        # Transcription runs in a worker process that owns the model and
+        # the transcript cache. num_workers > 1 transcribes long files in
+        # parallel chunks, batch_size > 0 batches the chunks of long files
+        # and a refine_model re-decodes low-confidence segments. Jobs are
+        # checkpointed, so an interrupted file resumes where it stopped,
+        # and each file is decoded to PCM once, under pcm_dir.
+        # The model is loaded on the first transcription, not here
+        self.pcm_cache = PcmCache(pcm_dir)
+        self.whisper = TranscriptionService(model_size=model_size, compute_type=compute_type,
+                                            cache_dir=cache_dir, cache_max_entries=cache_max_entries,
+                                            cache_max_bytes=cache_max_bytes, checkpoint_dir=checkpoint_dir,
+                                            pcm_dir=pcm_dir,
+                                            num_workers=num_workers,
+                                            cpu_threads=cpu_threads, vad_options=vad_options,
+                                            batch_size=batch_size, refine_model=refine_model)
 
 
     def process_upload(self, file_path: Path) -> Dict:
@@ -46,6 +66,10 @@ class MediaProcessor:
             raise Exception(f"Failed to process upload: {str(e)}")
 
 
+    def delete_source_files(self, audio_path: str):
+        """Drop the decoded audio of a deleted source"""
+        self.pcm_cache.delete(audio_path)
+
     def convert_to_audio(self, input_path: str, output_path: str):
         """Convert video to audio using ffmpeg"""
         try:
@@ -0,0 +1,100 @@
+# audio_processors/model_registry.py
+import threading
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+# Approximate parameter counts, used to estimate the RAM a model takes
+MODEL_PARAMETERS = {
+    'tiny': 39e6,
+    'base': 74e6,
+    'small': 244e6,
+    'medium': 769e6,
+    'large-v1': 1550e6,
+    'large-v2': 1550e6,
+    'large-v3': 1550e6,
+    'large': 1550e6,
+    'turbo': 809e6,
+    'large-v3-turbo': 809e6,
+    'distil-large-v3': 756e6,
+}
+
+# Bytes per weight for each CTranslate2 compute type
+BYTES_PER_WEIGHT = {
+    'int8': 1,
+    'int8_float32': 1,
+    'int8_float16': 1,
+    'int8_bfloat16': 1,
+    'float16': 2,
+    'bfloat16': 2,
+    'float32': 4,
+}
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded Whisper models
+
+    Models are loaded on first use and keyed by (model_size, compute_type,
+    cpu_threads), so processors with the same settings share one copy
+    whatever their language. Once the estimated size of the loaded models
+    exceeds ram_budget bytes, the least recently used ones are dropped.
+    The model just requested is always kept, even if it alone is over
+    budget.
+    """
+
+    def __init__(self, ram_budget: int = 4 * 1024 ** 3):
+        self.ram_budget = ram_budget
+        self.models = OrderedDict()   # key -> WhisperModel, most recently used last
+        self.sizes = {}               # key -> estimated bytes
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def estimate_bytes(model_size: str, compute_type: str) -> int:
+        """Rough resident size of a model, weights plus runtime overhead"""
+        parameters = MODEL_PARAMETERS.get(model_size, MODEL_PARAMETERS['large'])
+        return int(parameters * BYTES_PER_WEIGHT.get(compute_type, 4) * 1.3)
+
+    def get(self, model_size: str, compute_type: str = "int8", cpu_threads: int = 0):
+        """Loaded model for the settings, loading it on first use"""
+        key = (model_size, compute_type, cpu_threads)
+        with self.lock:
+            if key in self.models:
+                self.models.move_to_end(key)
+                return self.models[key]
+
+            from faster_whisper import WhisperModel
+            print(f"Loading Whisper model: {model_size} ({compute_type}, {cpu_threads or 'auto'} threads)")
+            model = WhisperModel(model_size, device="cpu", compute_type=compute_type,
+                                 cpu_threads=cpu_threads)
+            self.models[key] = model
+            self.sizes[key] = self.estimate_bytes(model_size, compute_type)
+            self.evict()
+            return model
+
+    def evict(self):
+        """Drop least recently used models until the estimate is within the budget"""
+        while len(self.models) > 1 and sum(self.sizes.values()) > self.ram_budget:
+            key, _ = self.models.popitem(last=False)
+            del self.sizes[key]
+            print(f"Unloading Whisper model: {key[0]} ({key[1]})")
+
+    def release(self, model_size: str, compute_type: str = "int8", cpu_threads: int = 0):
+        """Unload one model"""
+        key = (model_size, compute_type, cpu_threads)
+        with self.lock:
+            self.models.pop(key, None)
+            self.sizes.pop(key, None)
+
+    def clear(self):
+        """Unload all models"""
+        with self.lock:
+            self.models.clear()
+            self.sizes.clear()
+
+    def loaded(self) -> Dict[Tuple[str, str, int], int]:
+        """Estimated bytes of each loaded model, least recently used first"""
+        with self.lock:
+            return {key: self.sizes[key] for key in self.models}
+
+
+# Shared by every WhisperProcessor in the process
+shared_registry = ModelRegistry()
@@ -0,0 +1,186 @@
+# audio_processors/parallel.py
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import ffmpeg
+import numpy as np
+
+from .vad import SAMPLE_RATE, VadStats, transcribe_with_vad
+
+# Model of the current worker process, loaded once by init_worker
+worker_model = None
+
+
+def init_worker(model_size: str, compute_type: str, cpu_threads: int):
+    """Process pool initializer, loads the model once per worker"""
+    global worker_model
+    from .model_registry import shared_registry
+    worker_model = shared_registry.get(model_size, compute_type, cpu_threads)
+
+
+def load_clip(audio_path: str, start: float, end: float = None) -> np.ndarray:
+    """Decode part of an audio file to 16 kHz mono float32 samples"""
+    options = {'ss': start} if start else {}
+    if end is not None:
+        options['t'] = end - start
+    out, _ = (
+        ffmpeg.input(audio_path, **options)
+        .output('pipe:', format='f32le', ac=1, ar=SAMPLE_RATE)
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    return np.frombuffer(out, np.float32)
+
+
+def transcribe_chunk(audio_path: str, start: float, end: float, language: str,
+                     decode_options: Dict, vad_options: Dict, pcm_path: str = None) -> Dict:
+    """Transcribe one chunk in a worker, with timestamps relative to the whole file
+
+    Reads the samples from the decoded PCM file at pcm_path when given.
+    """
+    from .whisper import WhisperProcessor
+    if pcm_path:
+        samples = np.memmap(pcm_path, dtype=np.float32, mode='r')
+        audio = np.array(samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)])
+    else:
+        audio = load_clip(audio_path, start, end)
+    segments, duration, speech_duration = transcribe_with_vad(
+        worker_model, audio, language, decode_options, vad_options)
+    return {
+        'segments': [WhisperProcessor.segment_to_dict(segment, offset=start)
+                     for segment in segments if segment.text.strip()],
+        'duration': duration,
+        'speech_duration': speech_duration
+    }
+
+
+def probe_duration(audio_path: str) -> float:
+    """Duration of a media file in seconds"""
+    return float(ffmpeg.probe(audio_path)['format']['duration'])
+
+
+def detect_silences(audio_path: str, noise_db: float = -35.0,
+                    min_duration: float = 0.5) -> List[Tuple[float, float]]:
+    """(start, end) of every silence, found with ffmpeg's silencedetect filter"""
+    _, err = (
+        ffmpeg.input(audio_path).audio
+        .filter('silencedetect', noise=f'{noise_db}dB', d=min_duration)
+        .output('-', format='null')
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    silences, start = [], None
+    for line in err.decode('utf-8', errors='replace').splitlines():
+        match = re.search(r'silence_(start|end): (-?[\d.]+)', line)
+        if not match:
+            continue
+        if match.group(1) == 'start':
+            start = max(0.0, float(match.group(2)))
+        elif start is not None:
+            silences.append((start, float(match.group(2))))
+            start = None
+    return silences
+
+
+def plan_chunks(duration: float, silences: List[Tuple[float, float]], chunk_length: float = 120.0,
+                search_window: float = 20.0, overlap: float = 2.0) -> List[Tuple[float, float, float, float]]:
+    """Split [0, duration] into chunks of about chunk_length seconds
+
+    Returns (clip_start, clip_end, own_start, own_end) per chunk. Chunks
+    are cut in the middle of the silence closest to each target point.
+    Where there is no silence within search_window the cut is forced and
+    the neighbouring clips overlap by `overlap` seconds on each side; a
+    segment then belongs to the chunk that owns its midpoint.
+    """
+    midpoints = [(start + end) / 2 for start, end in silences]
+    chunks = []
+    clip_start = own_start = 0.0
+    while duration - own_start > chunk_length * 1.5:
+        target = own_start + chunk_length
+        candidates = [m for m in midpoints if abs(m - target) <= search_window and m > own_start]
+        if candidates:
+            cut = min(candidates, key=lambda m: abs(m - target))
+            chunks.append((clip_start, cut, own_start, cut))
+            clip_start = cut
+        else:
+            cut = target
+            chunks.append((clip_start, cut + overlap, own_start, cut))
+            clip_start = cut - overlap
+        own_start = cut
+    chunks.append((clip_start, duration, own_start, float('inf')))
+    return chunks
+
+
+class ParallelTranscriber:
+    """Transcribes long audio as silence-delimited chunks across a process pool
+
+    Every worker process loads its own copy of the model, limited to
+    cpu_threads threads, so num_workers * cpu_threads should not exceed
+    the number of cores. The pool is kept for later files until close().
+    """
+
+    def __init__(self, model_size: str, compute_type: str, num_workers: int,
+                 cpu_threads: int = 1, chunk_length: float = 120.0, pcm_cache=None):
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.num_workers = num_workers
+        self.cpu_threads = cpu_threads
+        self.chunk_length = chunk_length
+        self.pcm_cache = pcm_cache
+        self.executor = None
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """Start the worker pool on first use"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(self.model_size, self.compute_type, self.cpu_threads)
+            )
+        return self.executor
+
+    def stream(self, audio_path: str, language: str, decode_options: Dict, vad_options: Dict,
+               vad_stats: VadStats, progress_callback: Callable[[int], None] = None,
+               start: float = 0.0) -> Iterator[Dict]:
+        """Yield segments from `start` seconds on, in order as the chunks finish"""
+        if self.pcm_cache is not None:
+            duration = self.pcm_cache.duration(audio_path)
+            all_silences = self.pcm_cache.silences(audio_path)
+            pcm_path = str(self.pcm_cache.path(audio_path))
+        else:
+            duration = probe_duration(audio_path)
+            all_silences = detect_silences(audio_path)
+            pcm_path = None
+        silences = [(silence_start - start, silence_end - start)
+                    for silence_start, silence_end in all_silences
+                    if silence_start >= start]
+        chunks = [tuple(t + start for t in chunk)
+                  for chunk in plan_chunks(duration - start, silences, self.chunk_length)]
+        print(f"Transcribing {audio_path} as {len(chunks)} chunks on {self.num_workers} workers")
+
+        executor = self.get_executor()
+        futures = [
+            executor.submit(transcribe_chunk, audio_path, clip_start, clip_end,
+                            language, decode_options, vad_options, pcm_path)
+            for clip_start, clip_end, _, _ in chunks
+        ]
+        try:
+            for index, (future, (_, _, own_start, own_end)) in enumerate(zip(futures, chunks)):
+                result = future.result()
+                vad_stats.record(result['duration'], result['speech_duration'])
+                for segment in result['segments']:
+                    # Drop the copy of a segment decoded in a neighbour's overlap
+                    if own_start <= (segment['start'] + segment['end']) / 2 < own_end:
+                        yield segment
+                if progress_callback:
+                    progress_callback(int((index + 1) / len(chunks) * 100))
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def close(self, wait: bool = False):
+        """Shut the worker pool down, with wait until its processes exited"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=wait, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,97 @@
+# audio_processors/pcm_cache.py
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import List, Tuple
+
+import ffmpeg
+import numpy as np
+
+from .vad import SAMPLE_RATE, frame_energy_db
+
+
+class PcmCache:
+    """Decoded audio of each source, 16 kHz mono float32, memory-mapped
+
+    Every file is decoded by ffmpeg once, straight to a raw float32 file
+    named by a hash of its path. Transcription and silence detection then
+    read slices of the mapping instead of decoding the file again. An entry is stale once the audio file is newer than it,
+    and is removed together with its source.
+    """
+
+    def __init__(self, cache_dir: str = "./cache/pcm"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+
+    def path(self, audio_path: str) -> Path:
+        """Raw PCM file of an audio file"""
+        key = hashlib.sha1(str(Path(audio_path).resolve()).encode('utf-8')).hexdigest()
+        return self.cache_dir / f"{key}.f32"
+
+    def is_fresh(self, audio_path: str) -> bool:
+        """Whether the cached PCM of a file is there and newer than the file"""
+        path = self.path(audio_path)
+        try:
+            return path.stat().st_mtime >= Path(audio_path).stat().st_mtime
+        except FileNotFoundError:
+            return False
+
+    def decode(self, audio_path: str):
+        """Decode a file to its cache entry"""
+        path = self.path(audio_path)
+        temp_path = path.with_name(path.name + '.tmp')
+        print(f"Decoding {audio_path} to PCM")
+        try:
+            (
+                ffmpeg.input(str(audio_path))
+                .output(str(temp_path), format='f32le', acodec='pcm_f32le', ac=1, ar=SAMPLE_RATE)
+                .overwrite_output()
+                .run(capture_stdout=True, capture_stderr=True)
+            )
+            os.replace(temp_path, path)
+        except ffmpeg.Error as e:
+            temp_path.unlink(missing_ok=True)
+            raise Exception(f"FFmpeg error: {e.stderr.decode('utf8', errors='replace')}")
+
+    def load(self, audio_path: str) -> np.ndarray:
+        """Samples of a file as a read-only mapping, decoding it on first use"""
+        with self.lock:
+            if not self.is_fresh(audio_path):
+                self.decode(audio_path)
+        path = self.path(audio_path)
+        if path.stat().st_size == 0:
+            return np.zeros(0, np.float32)
+        return np.memmap(path, dtype=np.float32, mode='r')
+
+    def clip(self, audio_path: str, start: float, end: float = None) -> np.ndarray:
+        """Samples between start and end seconds"""
+        audio = self.load(audio_path)
+        first = int(start * SAMPLE_RATE)
+        last = len(audio) if end is None else int(end * SAMPLE_RATE)
+        return audio[first:last]
+
+    def duration(self, audio_path: str) -> float:
+        """Length of a file in seconds"""
+        return len(self.load(audio_path)) / SAMPLE_RATE
+
+    def frame_energy_db(self, audio_path: str, frame_ms: int = 30,
+                        block_frames: int = 2000) -> np.ndarray:
+        """RMS energy in dB of consecutive frames of a file"""
+        return frame_energy_db(self.load(audio_path), frame_ms, block_frames)
+
+    def silences(self, audio_path: str, noise_db: float = -35.0,
+                 min_duration: float = 0.5, frame_ms: int = 30) -> List[Tuple[float, float]]:
+        """(start, end) of every silence, like ffmpeg's silencedetect"""
+        quiet = self.frame_energy_db(audio_path, frame_ms) < noise_db
+        edges = np.diff(np.concatenate(([0], quiet.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1) * frame_ms / 1000
+        ends = np.flatnonzero(edges == -1) * frame_ms / 1000
+        return [(start, end) for start, end in zip(starts.tolist(), ends.tolist())
+                if end - start >= min_duration]
+
+    def delete(self, audio_path: str):
+        """Remove a file's cached PCM"""
+        with self.lock:
+            self.path(audio_path).unlink(missing_ok=True)
@@ -0,0 +1,105 @@
+# audio_processors/segmentation.py
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+# Word endings that close a sentence or a clause, Japanese and Chinese included
+SENTENCE_ENDS = ('。', '！', '？', '!', '?', '.', '…', '」')
+CLAUSE_ENDS = ('、', '，', ',', ';', '；', ':', '：')
+
+# Boundary strength after a word, a cut is made at the strongest one available
+NO_BREAK, CLAUSE, SEGMENT_END, SENTENCE = range(4)
+
+# (word, segment it came from, index of the word in that segment, boundary after it)
+Entry = Tuple[Dict, Dict, int, int]
+
+
+def boundary_after(word: Dict, segment: Dict, index: int) -> int:
+    """How good a place the end of a word is for a card to end"""
+    text = word['word'].strip()
+    if text.endswith(SENTENCE_ENDS):
+        return SENTENCE
+    if index == len(segment['words']) - 1:
+        return SEGMENT_END
+    if text.endswith(CLAUSE_ENDS):
+        return CLAUSE
+    return NO_BREAK
+
+
+def make_unit(entries: List[Entry]) -> Dict:
+    """Build one segment out of consecutive words"""
+    first_word, first_segment, first_index, _ = entries[0]
+    last_word, last_segment, last_index, _ = entries[-1]
+    # Keep the segment's own edges where the unit starts or ends with it,
+    # word timestamps tend to clip the audio tightly
+    start = first_segment['start'] if first_index == 0 else first_word['start']
+    end = last_segment['end'] if last_index == len(last_segment['words']) - 1 else last_word['end']
+
+    unit = {
+        'start': start,
+        'end': end,
+        'text': ''.join(word['word'] for word, _, _, _ in entries).strip(),
+        'words': [word for word, _, _, _ in entries]
+    }
+    # Confidence of the source segments, weighted by the words taken from each
+    for key in ('avg_logprob', 'no_speech_prob'):
+        values = [segment.get(key) for _, segment, _, _ in entries if segment.get(key) is not None]
+        unit[key] = sum(values) / len(values) if values else None
+    return unit
+
+
+def find_cut(entries: List[Entry], min_length: float) -> int:
+    """Number of leading words to emit when a unit would grow too long
+
+    Picks the strongest boundary that leaves at least min_length seconds
+    before it, preferring the latest one of that strength. Without any
+    punctuation or segment end the widest pause between words is used.
+    """
+    start = entries[0][0]['start']
+    best, best_strength, best_gap = len(entries), NO_BREAK, -1.0
+    for i in range(len(entries) - 1, 0, -1):
+        word = entries[i - 1][0]
+        if word['end'] - start < min_length:
+            break
+        strength = entries[i - 1][3]
+        gap = entries[i][0]['start'] - word['end']
+        if strength > best_strength or (strength == best_strength == NO_BREAK and gap > best_gap):
+            best, best_strength, best_gap = i, strength, gap
+    return best
+
+
+def resegment(segments: Iterable[Dict], max_length: float = 15.0, min_length: float = 2.0,
+              max_gap: float = 2.0) -> Iterator[Dict]:
+    """Re-split transcribed segments into card sized units on word boundaries
+
+    A single pass over the words: short segments are merged until a
+    sentence or segment ends after at least min_length seconds, and a unit
+    about to pass max_length is cut at its best boundary. Pauses of
+    max_gap seconds or more always end a unit. Segments without word
+    timestamps are passed through as they are.
+    """
+    buffer: List[Entry] = []
+    for segment in segments:
+        words = segment.get('words')
+        if not words:
+            if buffer:
+                yield make_unit(buffer)
+                buffer = []
+            yield segment
+            continue
+
+        for index, word in enumerate(words):
+            if buffer and word['start'] - buffer[-1][0]['end'] >= max_gap:
+                yield make_unit(buffer)
+                buffer = []
+            while buffer and word['end'] - buffer[0][0]['start'] > max_length:
+                cut = find_cut(buffer, min_length)
+                yield make_unit(buffer[:cut])
+                buffer = buffer[cut:]
+
+            strength = boundary_after(word, segment, index)
+            buffer.append((word, segment, index, strength))
+            if strength >= SEGMENT_END and word['end'] - buffer[0][0]['start'] >= min_length:
+                yield make_unit(buffer)
+                buffer = []
+
+    if buffer:
+        yield make_unit(buffer)
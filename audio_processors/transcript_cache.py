@@ -0,0 +1,113 @@
+# audio_processors/transcript_cache.py
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+class TranscriptCache:
+    """Persistent cache of transcription results
+
+    Entries are JSON files named by a hash of the audio content and every
+    setting that affects the transcript (model size, compute type,
+    language and decoding options). A hit refreshes the file's mtime, and
+    the least recently used files are evicted once the cache holds more
+    than max_entries files or max_bytes bytes.
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, cache_dir: str = "./cache/transcripts", max_entries: int = 200,
+                 max_bytes: int = 200 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+        """SHA-256 of a file's content"""
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def make_key(self, audio_path: str, **settings) -> str:
+        """Cache key for an audio file transcribed with the given settings"""
+        payload = json.dumps({
+            'version': self.FORMAT_VERSION,
+            'audio': self.hash_file(audio_path),
+            **settings
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def entry_path(self, key: str) -> Path:
+        """File holding the entry for a key"""
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        """Cached segments for a key, None on a miss"""
+        path = self.entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                segments = json.load(f)['segments']
+            os.utime(path)  # Mark as recently used
+            self.hits += 1
+            return segments
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (json.JSONDecodeError, KeyError) as e:
+            print(f"Dropping unreadable transcript cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+
+    def put(self, key: str, segments: List[Dict]):
+        """Store segments and evict old entries if the cache is full"""
+        path = self.entry_path(key)
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'segments': segments}, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache is within its limits"""
+        with self.lock:
+            entries = []
+            for path in self.cache_dir.glob('*.json'):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+
+            total = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+                _, size, path = entries.pop(0)
+                path.unlink(missing_ok=True)
+                total -= size
+
+    def clear(self):
+        """Remove all entries"""
+        with self.lock:
+            for path in self.cache_dir.glob('*.json'):
+                path.unlink(missing_ok=True)
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        sizes = [path.stat().st_size for path in self.cache_dir.glob('*.json')]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(sizes),
+            'bytes': sum(sizes)
+        }
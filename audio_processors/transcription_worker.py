@@ -0,0 +1,358 @@
+# audio_processors/transcription_worker.py
+"""Transcription in a separate process, so decoding never holds the GUI's GIL
+
+Protocol, as dicts over two multiprocessing queues:
+
+    client -> worker   {'type': 'submit', 'job', 'audio_path', 'max_segment_length', 'language'}
+                       {'type': 'cancel', 'job'}              job '*' cancels everything
+                       {'type': 'configure', 'model_size', 'compute_type', 'cpu_threads',
+                        'num_workers', 'worker_threads'}
+                       {'type': 'stop'}
+    worker -> client   {'type': 'started', 'job'}
+                       {'type': 'segments', 'job', 'segments'}
+                       {'type': 'progress', 'job', 'percent'}
+                       {'type': 'done' | 'cancelled', 'job'}
+                       {'type': 'error', 'job', 'message'}
+
+The worker runs one job at a time and keeps its model loaded between jobs.
+Segments are sent in batches, see BATCH_SEGMENTS.
+"""
+import atexit
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterator, List
+
+# Segments are sent in batches of this size, or sooner once this many
+# seconds passed since the last batch, and at the end of the job
+BATCH_SEGMENTS = 8
+BATCH_SECONDS = 1.0
+
+
+def worker_main(requests, events, config: Dict):
+    """Entry point of the worker process"""
+    from .checkpoint import TranscriptCheckpoints
+    from .pcm_cache import PcmCache
+    from .transcript_cache import TranscriptCache
+    from .whisper import WhisperProcessor
+
+    config = dict(config)
+    cache = TranscriptCache(config.pop('cache_dir'), config.pop('cache_max_entries'),
+                            config.pop('cache_max_bytes'))
+    checkpoints = TranscriptCheckpoints(config.pop('checkpoint_dir'))
+    pcm_cache = PcmCache(config.pop('pcm_dir'))
+    whisper = WhisperProcessor(cache=cache, checkpoints=checkpoints, pcm_cache=pcm_cache, **config)
+
+    jobs = queue.Queue()
+    cancelled = set()
+
+    def read_requests():
+        """Queue jobs in order, cancellations take effect immediately"""
+        parent = multiprocessing.parent_process()
+        while True:
+            try:
+                message = requests.get(timeout=1.0)
+            except queue.Empty:
+                if parent is not None and not parent.is_alive():
+                    cancelled.add('*')
+                    jobs.put(None)
+                    return
+                continue
+            if message['type'] == 'cancel':
+                cancelled.add(message['job'])
+            else:
+                jobs.put(message)
+                if message['type'] == 'stop':
+                    return
+
+    threading.Thread(target=read_requests, daemon=True).start()
+
+    while True:
+        message = jobs.get()
+        if message is None or message['type'] == 'stop':
+            break
+        if message['type'] == 'configure':
+            whisper.set_model(message['model_size'], message['compute_type'])
+            whisper.set_threads(message['cpu_threads'], message['num_workers'],
+                                message['worker_threads'])
+        elif message['type'] == 'submit':
+            run_job(whisper, message, events, cancelled)
+    whisper.close()
+
+
+def run_job(whisper, job: Dict, events, cancelled: set):
+    """Transcribe one file, streaming segments and progress to the client"""
+    job_id = job['job']
+    if job_id in cancelled or '*' in cancelled:
+        cancelled.discard(job_id)
+        events.put({'type': 'cancelled', 'job': job_id})
+        return
+
+    events.put({'type': 'started', 'job': job_id})
+    stream = None
+    batch = []
+    last_batch = time.monotonic()
+
+    def flush(force: bool = False):
+        nonlocal batch, last_batch
+        if batch and (force or len(batch) >= BATCH_SEGMENTS
+                      or time.monotonic() - last_batch >= BATCH_SECONDS):
+            events.put({'type': 'segments', 'job': job_id, 'segments': batch})
+            batch = []
+            last_batch = time.monotonic()
+
+    def progress(percent: int):
+        # A slow segment must not hold back the ones before it
+        flush()
+        events.put({'type': 'progress', 'job': job_id, 'percent': percent})
+
+    try:
+        whisper.set_language(job['language'])
+        stream = whisper.stream(job['audio_path'], job['max_segment_length'],
+                                progress_callback=progress)
+        for segment in stream:
+            if job_id in cancelled or '*' in cancelled:
+                events.put({'type': 'cancelled', 'job': job_id})
+                return
+            batch.append(segment)
+            flush()
+        flush(force=True)
+        events.put({'type': 'done', 'job': job_id})
+    except Exception as e:
+        events.put({'type': 'error', 'job': job_id, 'message': str(e)})
+    finally:
+        if stream is not None:
+            stream.close()
+        cancelled.discard(job_id)
+
+
+class TranscriptionService:
+    """Client side of the transcription worker
+
+    Offers the stream/transcribe interface of WhisperProcessor, but every
+    job runs in a worker process that is started on first use and keeps
+    its model warm between jobs. A dispatcher thread routes the worker's
+    messages to the job they belong to. If the worker dies, the job it was
+    running fails and the worker is restarted for the jobs still queued.
+    """
+
+    # Restarts in a row without a job starting before queued jobs fail too
+    MAX_RESTARTS = 3
+
+    def __init__(self, model_size: str = "base", compute_type: str = "int8", language: str = "ja",
+                 cache_dir: str = "./cache/transcripts", cache_max_entries: int = 200,
+                 cache_max_bytes: int = 200 * 1024 * 1024,
+                 checkpoint_dir: str = "./cache/checkpoints", pcm_dir: str = "./cache/pcm",
+                 **whisper_options):
+        self.config = {
+            'model_size': model_size,
+            'compute_type': compute_type,
+            'cache_dir': cache_dir,
+            'cache_max_entries': cache_max_entries,
+            'cache_max_bytes': cache_max_bytes,
+            'checkpoint_dir': checkpoint_dir,
+            'pcm_dir': pcm_dir,
+            **whisper_options
+        }
+        self.language = language
+        self.context = multiprocessing.get_context('spawn')
+        self.process = None
+        self.requests = None
+        self.events = None
+        self.dispatcher = None
+        self.jobs = {}       # job id -> {'request', 'queue', 'started'}
+        self.restarts = 0    # Restarts since a job last started
+        self.closed = False
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def set_language(self, language: str):
+        """Set transcription language for later jobs, 'auto' detects it per file"""
+        from .whisper import WhisperProcessor
+        if (language != WhisperProcessor.AUTO_LANGUAGE
+                and language not in WhisperProcessor.SUPPORTED_LANGUAGES.values()):
+            raise ValueError(f"Unsupported language code: {language}")
+        self.language = language
+
+    def set_model(self, model_size: str, compute_type: str = None):
+        """Switch model for later jobs, without restarting the worker"""
+        with self.lock:
+            self.config['model_size'] = model_size
+            self.config['compute_type'] = compute_type or self.config['compute_type']
+            self.configure()
+
+    def apply_tuning(self, tuning: Dict):
+        """Use a calibrated compute type and thread layout for later jobs"""
+        with self.lock:
+            self.config['compute_type'] = tuning['compute_type']
+            self.config['cpu_threads'] = tuning.get('local_cpu_threads', tuning['cpu_threads'])
+            self.config['num_workers'] = tuning['num_workers']
+            self.config['worker_threads'] = tuning['cpu_threads']
+            self.configure()
+
+    def configure(self):
+        """Send the current settings to a running worker, caller holds the lock"""
+        if self.worker_alive():
+            self.requests.put({
+                'type': 'configure',
+                'model_size': self.config['model_size'],
+                'compute_type': self.config['compute_type'],
+                'cpu_threads': self.config.get('cpu_threads', 0),
+                'num_workers': self.config.get('num_workers', 1),
+                'worker_threads': self.config.get('worker_threads', 0)
+            })
+
+    def worker_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start_worker(self):
+        """Start the worker process and the dispatcher, caller holds the lock"""
+        self.requests = self.context.Queue()
+        self.events = self.context.Queue()
+        # Not a daemon, the worker may start its own chunk worker pool
+        process = self.context.Process(target=worker_main, name="transcription-worker",
+                                       args=(self.requests, self.events, self.config))
+        process.start()
+        self.process = process
+        print(f"Started transcription worker (pid {self.process.pid})")
+        if self.dispatcher is None:
+            self.dispatcher = threading.Thread(target=self.dispatch, name="transcription-dispatcher",
+                                               daemon=True)
+            self.dispatcher.start()
+
+    def dispatch(self):
+        """Route worker messages to their jobs and restart the worker if it dies"""
+        while not self.closed:
+            events = self.events
+            try:
+                message = events.get(timeout=0.5)
+            except queue.Empty:
+                with self.lock:
+                    if not self.closed and self.process is not None and not self.process.is_alive():
+                        self.recover()
+                continue
+            except (EOFError, OSError):
+                continue
+
+            with self.lock:
+                job = self.jobs.get(message['job'])
+                if job is None:
+                    continue
+                if message['type'] == 'started':
+                    job['started'] = True
+                    self.restarts = 0
+                    continue
+                if message['type'] in ('done', 'cancelled', 'error'):
+                    del self.jobs[message['job']]
+            job['queue'].put(message)
+
+    def recover(self):
+        """Fail the job the dead worker was running and restart it for the rest, caller holds the lock"""
+        exitcode = self.process.exitcode
+        print(f"Transcription worker exited unexpectedly (exit code {exitcode})")
+        self.process = None
+        for job_id, job in list(self.jobs.items()):
+            if job['started'] or self.restarts >= self.MAX_RESTARTS:
+                del self.jobs[job_id]
+                job['queue'].put({'type': 'error', 'job': job_id,
+                                  'message': f"Transcription worker crashed (exit code {exitcode})"})
+        if self.jobs:
+            self.restarts += 1
+            print(f"Restarting transcription worker for {len(self.jobs)} queued jobs")
+            self.start_worker()
+            for job in self.jobs.values():
+                self.requests.put(job['request'])
+
+    def submit(self, audio_path: str, max_segment_length: float) -> (str, queue.Queue):
+        """Queue a job, returns its id and the queue its messages arrive on"""
+        job_id = str(uuid.uuid4())
+        request = {
+            'type': 'submit',
+            'job': job_id,
+            'audio_path': str(audio_path),
+            'max_segment_length': max_segment_length,
+            'language': self.language
+        }
+        messages = queue.Queue()
+        with self.lock:
+            if self.closed:
+                raise Exception("Transcription failed: transcription service is closed")
+            if not self.worker_alive():
+                self.start_worker()
+            self.jobs[job_id] = {'request': request, 'queue': messages, 'started': False}
+            self.requests.put(request)
+        return job_id, messages
+
+    def busy(self) -> bool:
+        """Whether a job is running or queued"""
+        with self.lock:
+            return bool(self.jobs)
+
+    def cancel(self, job_id: str):
+        """Ask the worker to drop a job, queued or running"""
+        with self.lock:
+            if job_id in self.jobs and self.worker_alive():
+                self.requests.put({'type': 'cancel', 'job': job_id})
+
+    def stream(self, audio_path: str, max_segment_length: float = 15.0,
+               progress_callback: Callable[[int], None] = None) -> Iterator[Dict]:
+        """Transcribe in the worker, yielding segments as they arrive"""
+        for batch in self.stream_batches(audio_path, max_segment_length, progress_callback):
+            yield from batch
+
+    def stream_batches(self, audio_path: str, max_segment_length: float = 15.0,
+                       progress_callback: Callable[[int], None] = None) -> Iterator[List[Dict]]:
+        """Transcribe in the worker, yielding segments in the batches the worker sends
+
+        Closing the generator early cancels the job.
+        """
+        job_id, messages = self.submit(audio_path, max_segment_length)
+        finished = False
+        try:
+            while True:
+                message = messages.get()
+                if message['type'] == 'segments':
+                    yield message['segments']
+                elif message['type'] == 'progress':
+                    if progress_callback:
+                        progress_callback(message['percent'])
+                elif message['type'] in ('done', 'cancelled'):
+                    finished = True
+                    return
+                elif message['type'] == 'error':
+                    finished = True
+                    raise Exception(message['message'])
+        finally:
+            if not finished:
+                self.cancel(job_id)
+
+    def transcribe(self, audio_path: str, max_segment_length: float = 15.0) -> List[Dict]:
+        """Transcribe audio file and return segments"""
+        segments = list(self.stream(audio_path, max_segment_length))
+        print(f"Generated {len(segments)} segments")
+        if not segments:
+            raise Exception("Transcription failed: No valid segments were generated")
+        return segments
+
+    def close(self, timeout: float = 5.0):
+        """Stop the worker, failing any jobs still queued"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            for job_id, job in self.jobs.items():
+                job['queue'].put({'type': 'error', 'job': job_id,
+                                  'message': "Transcription failed: transcription service closed"})
+            self.jobs.clear()
+            process = self.process
+            if process is not None and process.is_alive():
+                self.requests.put({'type': 'cancel', 'job': '*'})
+                self.requests.put({'type': 'stop'})
+        if process is not None:
+            process.join(timeout)
+            if process.is_alive():
+                print("Transcription worker did not stop, terminating it")
+                process.terminate()
+                process.join(1.0)
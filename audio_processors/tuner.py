@@ -0,0 +1,221 @@
+# audio_processors/tuner.py
+"""One-shot calibration of the transcription settings for this machine
+
+Times a reference clip with a few thread layouts (chunk worker processes
+times threads per worker) and compute types, and returns the fastest
+combination for a model size. The best layout on 4 cores is rarely the
+best on 32, so the result is saved per model size and per machine.
+
+Usage:
+    python -m audio_processors.tuner --model base
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import ffmpeg
+
+from .benchmark import run_config, speech_source
+
+REFERENCE_SECONDS = 30
+
+# Language of the synthesized speech used without downloads
+SPEECH_LANGUAGE = "en"
+
+
+def reference_clip(language: str, cache_dir: str = "./cache/tuning",
+                   download_dir: str = "./downloads") -> Tuple[str, str]:
+    """Short clip and its language: the latest download, or synthesized speech"""
+    downloads = sorted(Path(download_dir).glob('*.mp3'), key=lambda p: p.stat().st_mtime)
+    if not downloads:
+        language = SPEECH_LANGUAGE
+    path = Path(cache_dir) / f"reference_{language}.mp3"
+    if path.exists():
+        return str(path), language
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if downloads:
+        # Real speech in the learning language decodes like the files the clip stands in for
+        stream = ffmpeg.input(str(downloads[-1]), stream_loop=-1, t=REFERENCE_SECONDS)
+    else:
+        stream = ffmpeg.input(speech_source(REFERENCE_SECONDS), f='lavfi')
+    try:
+        (
+            stream.output(str(path), acodec='libmp3lame', ac=1, ab='64k')
+            .overwrite_output()
+            .run(capture_stdout=True, capture_stderr=True)
+        )
+    except ffmpeg.Error as e:
+        raise Exception(f"FFmpeg error: {e.stderr.decode('utf8', errors='replace')}")
+    return str(path), language
+
+
+def thread_layouts(cpu_count: int) -> List[Tuple[int, int]]:
+    """(num_workers, cpu_threads) pairs to try, none using more threads than cores"""
+    layouts = [(1, cpu_count)]
+    if cpu_count >= 4:
+        layouts.append((1, cpu_count // 2))
+    for workers in (2, 4, 8):
+        if cpu_count // workers >= 2:
+            layouts.append((workers, cpu_count // workers))
+    return layouts
+
+
+def is_current(tuning: Optional[Dict]) -> bool:
+    """Whether calibration was done or attempted on a machine like this one"""
+    return tuning is not None and tuning.get('cpu_count') == os.cpu_count()
+
+
+def is_usable(tuning: Optional[Dict]) -> bool:
+    """Whether saved settings come from a successful calibration on this machine"""
+    return is_current(tuning) and not tuning.get('error')
+
+
+def run_candidate(config: Dict, audio_path: str, language: str, results):
+    """Entry point of the process timing one candidate"""
+    signal.signal(signal.SIGTERM, stop_candidate)
+    try:
+        results.put(run_config(config, [audio_path], language))
+    except Exception as e:
+        results.put({'config': config, 'error': str(e)})
+
+
+def stop_candidate(signum, frame):
+    """Take the chunk workers down with a cancelled candidate"""
+    for child in multiprocessing.active_children():
+        child.terminate()
+    os._exit(1)
+
+
+class Tuner:
+    """One calibration run, cancellable from another thread
+
+    Thread layouts are compared with the first compute type, then the
+    other compute types on the fastest layout. Each candidate runs in its
+    own process, which cancel() terminates. Every candidate decodes the
+    same short clip; a layout with n workers splits it into n + 1 chunks,
+    so that every worker has work. VAD is off so every run decodes the
+    whole clip.
+    """
+
+    def __init__(self, model_size: str = "base", compute_types: Tuple[str, ...] = ("int8", "float32"),
+                 audio_path: str = None, language: str = "auto"):
+        self.model_size = model_size
+        self.compute_types = compute_types
+        self.audio_path = audio_path
+        self.language = language
+        self.context = multiprocessing.get_context('spawn')
+        self.process = None
+        self.cancelled = False
+
+    def cancel(self):
+        """Stop the calibration, terminating the candidate being timed"""
+        self.cancelled = True
+        process = self.process
+        if process is not None and process.is_alive():
+            process.terminate()
+
+    def measure(self, compute_type: str, num_workers: int, cpu_threads: int) -> Optional[Dict]:
+        """Time one candidate, None if cancelled"""
+        if self.audio_path:
+            audio_path, language = self.audio_path, self.language
+        else:
+            audio_path, language = reference_clip(self.language)
+        config = {
+            'model_size': self.model_size, 'compute_type': compute_type, 'beam_size': 5,
+            'cpu_threads': cpu_threads, 'num_workers': num_workers,
+            # Files are only split when longer than two chunks
+            'chunk_length': REFERENCE_SECONDS / (num_workers + 1),
+            'vad': False, 'batch_size': 0, 'warmup': True
+        }
+        print(f"Calibrating {config}", file=sys.stderr)
+        results = self.context.Queue()
+        self.process = self.context.Process(target=run_candidate, name="transcription-tuner",
+                                            args=(config, audio_path, language, results))
+        self.process.start()
+        try:
+            while True:
+                try:
+                    return results.get(timeout=0.5)
+                except queue.Empty:
+                    if self.cancelled:
+                        return None
+                    if not self.process.is_alive():
+                        return {'config': config,
+                                'error': f"Calibration process exited (exit code {self.process.exitcode})"}
+        finally:
+            self.process.join(1.0)
+            self.process = None
+
+    def run(self, progress_callback: Callable[[int], None] = None) -> Optional[Dict]:
+        """Fastest settings for the model on this machine, None when cancelled"""
+        cpu_count = os.cpu_count() or 1
+        layouts = thread_layouts(cpu_count)
+        total = len(layouts) + len(self.compute_types) - 1
+        results = []
+
+        def run(compute_type: str, num_workers: int, cpu_threads: int) -> bool:
+            if self.cancelled:
+                return False
+            result = self.measure(compute_type, num_workers, cpu_threads)
+            if result is None:
+                return False
+            results.append(result)
+            if progress_callback:
+                progress_callback(int(len(results) / total * 100))
+            return True
+
+        def fastest(workers: bool = True) -> Optional[Dict]:
+            timed = [result for result in results if result.get('rtf') is not None
+                     and (workers or result['config']['num_workers'] == 1)]
+            return min(timed, key=lambda result: result['rtf']) if timed else None
+
+        for num_workers, cpu_threads in layouts:
+            if not run(self.compute_types[0], num_workers, cpu_threads):
+                return None
+        best = fastest()
+        if best is None:
+            errors = {result.get('error') for result in results}
+            raise Exception(f"Tuning failed: no run of {self.model_size} succeeded: "
+                            f"{'; '.join(map(str, errors))}")
+        for compute_type in self.compute_types[1:]:
+            if not run(compute_type, best['config']['num_workers'], best['config']['cpu_threads']):
+                return None
+
+        best = fastest()
+        # Short files, refinement and language detection use one in-process model
+        local = fastest(workers=False) or best
+        return {
+            'model_size': self.model_size,
+            'compute_type': best['config']['compute_type'],
+            'cpu_threads': best['config']['cpu_threads'],
+            'num_workers': best['config']['num_workers'],
+            'local_cpu_threads': local['config']['cpu_threads'],
+            'rtf': best['rtf'],
+            'cpu_count': cpu_count,
+            'tuned_at': datetime.now().isoformat(timespec='seconds')
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--model', default="base")
+    parser.add_argument('--compute-types', nargs='+', default=["int8", "float32"])
+    parser.add_argument('--audio', help="Clip to calibrate on instead of the reference clip")
+    parser.add_argument('--language', default="auto")
+    args = parser.parse_args()
+
+    tuner = Tuner(args.model, tuple(args.compute_types), args.audio, args.language)
+    tuning = tuner.run(progress_callback=lambda percent: print(f"{percent}%", file=sys.stderr))
+    print(json.dumps(tuning, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+# audio_processors/vad.py
+from typing import Dict, List, Tuple, Union
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+DEFAULT_VAD_OPTIONS = {
+    'enabled': True,
+    'method': 'silero',              # 'silero' (faster-whisper's VAD) or 'energy'
+    'threshold': 0.5,                # Silero speech probability
+    'energy_threshold_db': -40.0,    # Energy VAD, louder frames count as speech
+    'min_speech_duration_ms': 250,   # Shorter speech is dropped
+    'min_silence_duration_ms': 2000, # Shorter pauses don't split speech
+    'speech_pad_ms': 400,            # Kept around each speech region
+}
+
+# Longest clip the batched pipeline decodes, it drops anything after this
+BATCH_WINDOW_SECONDS = 30.0
+
+# Options passed on to faster-whisper's Silero VAD
+SILERO_OPTIONS = ('threshold', 'min_speech_duration_ms', 'min_silence_duration_ms', 'speech_pad_ms')
+
+
+def frame_energy_db(audio: np.ndarray, frame_ms: int = 30,
+                    block_frames: int = 2000) -> np.ndarray:
+    """RMS energy in dB of consecutive frames, computed a block at a time
+
+    Squaring a block at a time keeps the temporaries small, a whole
+    memory-mapped file squared at once would copy all of it.
+    """
+    frame = SAMPLE_RATE * frame_ms // 1000
+    count = len(audio) // frame
+    energy = np.empty(count, np.float32)
+    for first in range(0, count, block_frames):
+        last = min(first + block_frames, count)
+        frames = np.asarray(audio[first * frame:last * frame]).reshape(last - first, frame)
+        energy[first:last] = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    return energy
+
+
+def energy_speech_regions(audio: np.ndarray, options: Dict,
+                          frame_ms: int = 30) -> List[Tuple[float, float]]:
+    """(start, end) seconds of speech, from the RMS energy of short frames"""
+    energy_db = frame_energy_db(audio, frame_ms)
+    if len(energy_db) == 0:
+        return []
+    speech = energy_db > options['energy_threshold_db']
+
+    # Runs of consecutive speech frames
+    edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1) * frame_ms / 1000
+    ends = np.flatnonzero(edges == -1) * frame_ms / 1000
+
+    min_silence = options['min_silence_duration_ms'] / 1000
+    min_speech = options['min_speech_duration_ms'] / 1000
+    pad = options['speech_pad_ms'] / 1000
+    duration = len(audio) / SAMPLE_RATE
+
+    merged = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        if merged and start - merged[-1][1] < min_silence:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    regions = []
+    for start, end in merged:
+        if end - start < min_speech:
+            continue
+        start, end = max(0.0, start - pad), min(duration, end + pad)
+        if regions and start <= regions[-1][1]:
+            regions[-1] = (regions[-1][0], end)
+        else:
+            regions.append((start, end))
+    return regions
+
+
+def clip_timestamps(regions: List[Tuple[float, float]], batched: bool):
+    """Speech regions in the clip_timestamps format of the model or the batched pipeline
+
+    For the batched pipeline, regions longer than BATCH_WINDOW_SECONDS
+    are split into equal pieces no longer than that.
+    """
+    if batched:
+        clips = []
+        for start, end in regions:
+            pieces = max(1, int(np.ceil((end - start) / BATCH_WINDOW_SECONDS)))
+            bounds = np.linspace(start, end, pieces + 1).tolist()
+            clips.extend({'start': first, 'end': last} for first, last in zip(bounds[:-1], bounds[1:]))
+        return clips
+    return [t for region in regions for t in region]
+
+
+def transcribe_with_vad(model, audio: Union[str, np.ndarray], language: str,
+                        decode_options: Dict, vad_options: Dict = None, batch_size: int = 0):
+    """Run model.transcribe behind the configured VAD stage
+
+    Returns (segments, duration, speech_duration), where speech_duration
+    is the part of the audio that was actually decoded. Falls back to the
+    energy VAD when Silero can't be loaded. With batch_size > 0, model is
+    a BatchedInferencePipeline, which needs speech regions to batch.
+    """
+    options = {**DEFAULT_VAD_OPTIONS, **(vad_options or {})}
+    batching = {'batch_size': batch_size} if batch_size else {}
+    if not options['enabled']:
+        if not batch_size:
+            segments, info = model.transcribe(audio, language=language, **decode_options)
+            return segments, info.duration, info.duration
+        # The pipeline batches fixed windows instead of speech regions
+        if isinstance(audio, str):
+            from .parallel import load_clip
+            audio = load_clip(audio, 0)
+        duration = len(audio) / SAMPLE_RATE
+        windows = [(0.0, duration)] if duration else []
+        if not windows:
+            return iter(()), duration, 0.0
+        segments, info = model.transcribe(audio, language=language,
+                                          clip_timestamps=clip_timestamps(windows, True),
+                                          **batching, **decode_options)
+        return segments, duration, duration
+
+    if options['method'] == 'silero':
+        try:
+            segments, info = model.transcribe(
+                audio,
+                language=language,
+                vad_filter=True,
+                vad_parameters={key: options[key] for key in SILERO_OPTIONS},
+                **batching,
+                **decode_options
+            )
+            return segments, info.duration, getattr(info, 'duration_after_vad', info.duration)
+        except ImportError as e:
+            print(f"Silero VAD unavailable ({e}), using the energy-based VAD")
+
+    if isinstance(audio, str):
+        from .parallel import load_clip
+        audio = load_clip(audio, 0)
+    duration = len(audio) / SAMPLE_RATE
+    regions = energy_speech_regions(audio, options)
+    if not regions:
+        return iter(()), duration, 0.0
+    segments, info = model.transcribe(
+        audio,
+        language=language,
+        clip_timestamps=clip_timestamps(regions, bool(batch_size)),
+        **batching,
+        **decode_options
+    )
+    return segments, duration, sum(end - start for start, end in regions)
+
+
+def speech_regions(audio: np.ndarray, vad_options: Dict = None) -> List[Tuple[float, float]]:
+    """(start, end) seconds of speech, from Silero or else the energy VAD"""
+    options = {**DEFAULT_VAD_OPTIONS, **(vad_options or {})}
+    if options['method'] == 'silero':
+        try:
+            from faster_whisper.vad import VadOptions, get_speech_timestamps
+            timestamps = get_speech_timestamps(
+                audio, VadOptions(**{key: options[key] for key in SILERO_OPTIONS}))
+            return [(t['start'] / SAMPLE_RATE, t['end'] / SAMPLE_RATE) for t in timestamps]
+        except ImportError as e:
+            print(f"Silero VAD unavailable ({e}), using the energy-based VAD")
+    return energy_speech_regions(audio, options)
+
+
+def first_speech(audio: np.ndarray, vad_options: Dict = None, seconds: float = 30.0) -> np.ndarray:
+    """The first `seconds` of speech in audio, pauses cut out
+
+    Falls back to the start of the audio when no speech is found.
+    """
+    pieces = []
+    remaining = seconds
+    for start, end in speech_regions(audio, vad_options):
+        end = min(end, start + remaining)
+        pieces.append(audio[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)])
+        remaining -= end - start
+        if remaining <= 0:
+            break
+    if not pieces:
+        return audio[:int(seconds * SAMPLE_RATE)]
+    return np.concatenate(pieces)
+
+
+class VadStats:
+    """How much audio the VAD stage kept away from the decoder"""
+
+    def __init__(self):
+        self.files = 0
+        self.audio_seconds = 0.0
+        self.skipped_seconds = 0.0
+
+    def record(self, duration: float, speech_duration: float):
+        """Count one transcribed file or chunk"""
+        self.files += 1
+        self.audio_seconds += duration
+        self.skipped_seconds += max(0.0, duration - speech_duration)
+
+    def get_stats(self) -> Dict:
+        """Totals and the ratio of skipped audio"""
+        return {
+            'files': self.files,
+            'audio_seconds': round(self.audio_seconds, 1),
+            'skipped_seconds': round(self.skipped_seconds, 1),
+            'skipped_ratio': self.skipped_seconds / self.audio_seconds if self.audio_seconds else 0.0
+        }
@@ -1,9 +1,16 @@
 # audio_processors/whisper.py
-from faster_whisper import WhisperModel
-from typing import List, Dict
+from typing import Callable, Dict, Iterator, List
 import uuid
 import json
 from pathlib import Path
+import numpy as np
+from .transcript_cache import TranscriptCache
+from .checkpoint import TranscriptCheckpoints
+from .pcm_cache import PcmCache
+from .parallel import ParallelTranscriber, load_clip, probe_duration
+from .vad import DEFAULT_VAD_OPTIONS, VadStats, first_speech, transcribe_with_vad
+from .model_registry import ModelRegistry, shared_registry
+from .segmentation import resegment
 
 class WhisperProcessor:
     # Dictionary of supported languages with their codes
@@ -21,49 +28,356 @@ class WhisperProcessor:
         # Add more languages as needed
     }
 
-    def __init__(self, model_size: str = "base", language: str = "ja"):
-        """Initialize Whisper processor"""
-        print(f"Initializing Whisper with model size: {model_size}")
-        self.model = WhisperModel(model_size, device="cpu", compute_type="int8")
+    # Language setting that detects the language of each file
+    AUTO_LANGUAGE = 'auto'
+    # Audio searched for speech, and seconds of speech used, to detect a language
+    LANGUAGE_PROBE_SECONDS = 120.0
+    LANGUAGE_SPEECH_SECONDS = 30.0
+
+    def __init__(self, model_size: str = "base", language: str = "ja",
+                 compute_type: str = "int8", cache: TranscriptCache = None,
+                 num_workers: int = 1, cpu_threads: int = 0, vad_options: Dict = None,
+                 batch_size: int = 0, batched_min_duration: float = 60.0,
+                 registry: ModelRegistry = None, refine_model: str = None,
+                 refine_threshold: float = -0.8, min_segment_length: float = 2.0,
+                 checkpoints: TranscriptCheckpoints = None, pcm_cache: PcmCache = None,
+                 chunk_length: float = 120.0, worker_threads: int = 0):
+        """Initialize Whisper processor
+
+        The local model uses cpu_threads threads (0 lets CTranslate2
+        decide). With num_workers > 1 long files are split into chunks of
+        about chunk_length seconds that are transcribed in parallel worker
+        processes, each using worker_threads threads (0 uses cpu_threads). vad_options override
+        DEFAULT_VAD_OPTIONS for the voice activity filter. With
+        batch_size > 0 files of at least batched_min_duration seconds
+        are decoded batch_size speech chunks per forward pass.
+
+        The model itself is only loaded from the registry (shared_registry
+        by default) when the first file is transcribed.
+
+        With a refine_model the first model only drafts the transcript.
+        Draft segments whose avg_logprob is below refine_threshold are
+        decoded again, over their own time range, with refine_model.
+
+        Segments are then re-split on word boundaries into units between
+        min_segment_length and max_segment_length seconds.
+
+        With checkpoints (which need a cache for their keys) finished
+        segments are saved while decoding, and an interrupted file
+        resumes after the last saved segment.
+
+        With a pcm_cache each file is decoded once, and the model, the
+        refinement pass and the chunk workers all read the cached samples.
+
+        With language 'auto' the language of each file is detected on its
+        first seconds of speech and stored on every segment.
+        """
+        self.model_size = model_size
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.registry = registry or shared_registry
         self.language = language
+        self.decode_options = {'beam_size': 5, 'word_timestamps': True}
+        self.vad_options = {**DEFAULT_VAD_OPTIONS, **(vad_options or {})}
+        self.vad_stats = VadStats()
+        self.cache = cache
+        self.num_workers = num_workers
+        self.worker_threads = worker_threads
+        self.chunk_length = chunk_length
+        self.parallel = None
+        self.batch_size = batch_size
+        self.batched_min_duration = batched_min_duration
+        self.batched = None
+        self.refine_model = refine_model
+        self.refine_threshold = refine_threshold
+        self.min_segment_length = min_segment_length
+        self.checkpoints = checkpoints
+        self.pcm_cache = pcm_cache
         
+    @property
+    def model(self):
+        """Local model for the current settings, loaded on first use"""
+        return self.registry.get(self.model_size, self.compute_type, self.cpu_threads)
+
+    def set_model(self, model_size: str, compute_type: str = None):
+        """Switch model size or compute type, the model is loaded when next used"""
+        if (model_size, compute_type or self.compute_type) == (self.model_size, self.compute_type):
+            return
+        self.close()  # Workers and the batched pipeline hold the old model
+        self.model_size = model_size
+        self.compute_type = compute_type or self.compute_type
+
+    def set_threads(self, cpu_threads: int, num_workers: int, worker_threads: int = 0):
+        """Switch the thread layout, the model and workers are loaded when next used"""
+        if (cpu_threads, num_workers, worker_threads) == \
+                (self.cpu_threads, self.num_workers, self.worker_threads):
+            return
+        self.close()
+        self.cpu_threads = cpu_threads
+        self.num_workers = num_workers
+        self.worker_threads = worker_threads
+
     def set_language(self, language: str):
-        """Set transcription language"""
-        if language in self.SUPPORTED_LANGUAGES.values():
+        """Set transcription language, or 'auto' to detect it per file"""
+        if language == self.AUTO_LANGUAGE or language in self.SUPPORTED_LANGUAGES.values():
             self.language = language
         else:
             raise ValueError(f"Unsupported language code: {language}")
         
+    def cache_key(self, audio_path: str, max_segment_length: float) -> str:
+        """Transcript cache key for an audio file with the current settings"""
+        # Chunked transcripts can differ slightly at the chunk boundaries
+        chunking = {'chunk_length': self.get_parallel().chunk_length} if self.use_parallel(audio_path) else {}
+        # Batched decoding splits the audio differently from the sequential path
+        if not chunking and self.use_batched(audio_path):
+            chunking = {'batch_size': self.batch_size}
+        return self.cache.make_key(
+            audio_path,
+            model_size=self.model_size,
+            compute_type=self.compute_type,
+            language=self.language,
+            max_segment_length=max_segment_length,
+            min_segment_length=self.min_segment_length,
+            vad=self.vad_options,
+            **chunking,
+            **({'refine_model': self.refine_model, 'refine_threshold': self.refine_threshold}
+               if self.refine_model else {}),
+            **self.decode_options
+        )
+
+    def get_parallel(self) -> ParallelTranscriber:
+        """Chunked transcriber for num_workers > 1, created on first use"""
+        if self.parallel is None:
+            self.parallel = ParallelTranscriber(
+                self.model_size, self.compute_type, self.num_workers,
+                cpu_threads=self.worker_threads or self.cpu_threads or 1, chunk_length=self.chunk_length,
+                pcm_cache=self.pcm_cache
+            )
+        return self.parallel
+
+    def use_parallel(self, audio_path: str) -> bool:
+        """Whether a file is long enough to be worth splitting across workers"""
+        if self.num_workers <= 1:
+            return False
+        return self.duration(audio_path) > 2 * self.get_parallel().chunk_length
+
+    def get_batched(self):
+        """Batched pipeline over the local model, None if faster-whisper is too old"""
+        model = self.model
+        if self.batched is None or self.batched.model is not model:
+            try:
+                from faster_whisper import BatchedInferencePipeline
+            except ImportError:
+                print("Batched inference needs faster-whisper 1.2, decoding sequentially")
+                self.batch_size = 0
+                return None
+            self.batched = BatchedInferencePipeline(model=model)
+        return self.batched
+
+    def use_batched(self, audio_path: str) -> bool:
+        """Whether a file is long enough for batching to beat sequential decoding"""
+        if self.batch_size <= 0:
+            return False
+        return self.duration(audio_path) >= self.batched_min_duration
+
+    def duration(self, audio_path: str) -> float:
+        """Length of a file in seconds, without decoding it just for that"""
+        if self.pcm_cache is not None and self.pcm_cache.is_fresh(audio_path):
+            return self.pcm_cache.duration(audio_path)
+        return probe_duration(audio_path)
+
+    def load_audio(self, audio_path: str, start: float = 0.0, end: float = None):
+        """Samples between start and end seconds, from the PCM cache if there is one"""
+        if self.pcm_cache is not None:
+            return self.pcm_cache.clip(audio_path, start, end)
+        return load_clip(audio_path, start, end)
+
+    def detect_language(self, audio_path: str) -> str:
+        """Language of a file, detected on its first seconds of speech only"""
+        audio = np.asarray(self.load_audio(audio_path, 0.0, self.LANGUAGE_PROBE_SECONDS))
+        speech = first_speech(audio, self.vad_options, self.LANGUAGE_SPEECH_SECONDS)
+        model = self.model
+        if hasattr(model, 'detect_language'):
+            language, probability, _ = model.detect_language(speech)
+        else:
+            # Older faster-whisper detects the language before decoding anything
+            _, info = model.transcribe(speech, language=None)
+            language, probability = info.language, info.language_probability
+        print(f"Detected language {language} ({probability:.0%}) in {audio_path}")
+        return language
+
+    def close(self):
+        """Stop worker processes and drop the batched pipeline"""
+        if self.parallel is not None:
+            self.parallel.close()
+            self.parallel = None
+        self.batched = None
+
+    @staticmethod
+    def segment_to_dict(segment, offset: float = 0.0) -> Dict:
+        """Convert a faster-whisper segment, shifting its timestamps by `offset`"""
+        return {
+            'start': segment.start + offset,
+            'end': segment.end + offset,
+            'text': segment.text.strip(),
+            'avg_logprob': getattr(segment, 'avg_logprob', None),
+            'no_speech_prob': getattr(segment, 'no_speech_prob', None),
+            'words': [{'word': w.word, 'start': w.start + offset, 'end': w.end + offset}
+                    for w in segment.words] if segment.words else []
+        }
+
     def transcribe(self, audio_path: str, max_segment_length: float = 15.0) -> List[Dict]:
         """Transcribe audio file and return segments"""
+        processed_segments = list(self.stream(audio_path, max_segment_length))
+        print(f"Generated {len(processed_segments)} segments")
+        if not processed_segments:
+            raise Exception("Transcription failed: No valid segments were generated")
+        return processed_segments
+
+    def stream(self, audio_path: str, max_segment_length: float = 15.0,
+               progress_callback: Callable[[int], None] = None) -> Iterator[Dict]:
+        """Transcribe audio file, yielding segments as soon as they are decoded
+
+        progress_callback gets the percentage of the audio covered so far.
+        """
         try:
-            print(f"Starting transcription of: {audio_path} in {self.language}")
-            segments, _ = self.model.transcribe(
-                audio_path,
-                language=self.language,
-                beam_size=5,
-                word_timestamps=True
-            )
-            
-            processed_segments = []
-            for segment in segments:
-                # Only add segments that have actual content
-                if segment.text.strip():
-                    processed_segments.append({
-                        'id': str(uuid.uuid4()),
-                        'start': segment.start,
-                        'end': segment.end,
-                        'text': segment.text.strip(),
-                        'words': [{'word': w.word, 'start': w.start, 'end': w.end} 
-                                for w in segment.words] if segment.words else []
-                    })
+            cache_key = None
+            if self.cache is not None:
+                cache_key = self.cache_key(audio_path, max_segment_length)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    print(f"Using cached transcript of: {audio_path}")
+                    # Fresh ids, the same audio may be added as another source
+                    for segment in cached:
+                        yield {**segment, 'id': str(uuid.uuid4())}
+                    if progress_callback:
+                        progress_callback(100)
+                    return
+
+            # Segments saved by an earlier, interrupted run keep their ids,
+            # so cards already created from them are updated, not duplicated
+            resumed, checkpoint = [], None
+            if cache_key is not None and self.checkpoints is not None:
+                resumed = self.checkpoints.load(cache_key)
+                checkpoint = self.checkpoints.open(cache_key)
+            offset = resumed[-1]['end'] if resumed else 0.0
+            if resumed:
+                print(f"Resuming transcription of {audio_path} at {offset:.0f}s "
+                      f"after {len(resumed)} checkpointed segments")
+
+            language = self.language
+            if language == self.AUTO_LANGUAGE:
+                language = (resumed[0].get('language') if resumed else None) or \
+                    self.detect_language(audio_path)
+
+            if self.use_parallel(audio_path):
+                decoded = self.get_parallel().stream(
+                    audio_path, language, self.decode_options, self.vad_options,
+                    self.vad_stats, progress_callback, start=offset)
+            else:
+                decoded = self.decode(audio_path, progress_callback, offset=offset, language=language)
+
+            if self.refine_model:
+                decoded = self.refine_all(audio_path, decoded, language)
+            if max_segment_length:
+                decoded = resegment(decoded, max_segment_length, self.min_segment_length)
+
+            processed_segments = list(resumed)
+            try:
+                yield from resumed
+                for segment in decoded:
+                    processed = {'id': str(uuid.uuid4()), **segment, 'language': language}
+                    processed_segments.append(processed)
+                    if checkpoint is not None:
+                        checkpoint.append(processed)
+                    yield processed
+            finally:
+                if checkpoint is not None:
+                    checkpoint.close()
             
-            print(f"Generated {len(processed_segments)} segments")
-            if not processed_segments:
-                raise Exception("No valid segments were generated")
-                
-            return processed_segments
+            if cache_key is not None and processed_segments:
+                self.cache.put(cache_key, processed_segments)
+            if checkpoint is not None:
+                self.checkpoints.discard(cache_key)
             
         except Exception as e:
             print(f"Transcription error: {str(e)}")
-            raise Exception(f"Transcription failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Transcription failed: {str(e)}")
+
+    def needs_refinement(self, segment: Dict) -> bool:
+        """Whether a draft segment is below the confidence threshold"""
+        return (self.refine_model is not None and segment.get('avg_logprob') is not None
+                and segment['avg_logprob'] < self.refine_threshold)
+
+    def refine_all(self, audio_path: str, segments: Iterator[Dict], language: str) -> Iterator[Dict]:
+        """Refine the low-confidence segments of a draft transcript"""
+        refined = total = 0
+        for segment in segments:
+            total += 1
+            if self.needs_refinement(segment):
+                segment = self.refine(audio_path, segment, language)
+                refined += 1
+            yield segment
+        print(f"Refined {refined} of {total} segments with {self.refine_model}")
+
+    def refine(self, audio_path: str, segment: Dict, language: str) -> Dict:
+        """Decode a draft segment's time range again with the refine model
+
+        The segment keeps its boundaries, so it still lines up with its
+        neighbours. The draft is kept when the refine model hears nothing.
+        """
+        model = self.registry.get(self.refine_model, self.compute_type, self.cpu_threads)
+        clip = self.load_audio(audio_path, segment['start'], segment['end'])
+        pieces, _ = model.transcribe(clip, language=language, **self.decode_options)
+        pieces = [self.segment_to_dict(piece, offset=segment['start'])
+                  for piece in pieces if piece.text.strip()]
+        if not pieces:
+            return segment
+
+        # Confidence of the whole range, weighted by the duration of each piece
+        weights = [max(piece['end'] - piece['start'], 0.01) for piece in pieces]
+        def weighted(key):
+            values = [(piece[key], weight) for piece, weight in zip(pieces, weights)
+                      if piece[key] is not None]
+            total = sum(weight for _, weight in values)
+            return sum(value * weight for value, weight in values) / total if total else None
+
+        separator = '' if language in ('ja', 'zh') else ' '
+        return {
+            **segment,
+            'text': separator.join(piece['text'] for piece in pieces),
+            'words': [word for piece in pieces for word in piece['words']],
+            'avg_logprob': weighted('avg_logprob'),
+            'no_speech_prob': weighted('no_speech_prob')
+        }
+
+    def decode(self, audio_path: str, progress_callback: Callable[[int], None] = None,
+               offset: float = 0.0, language: str = None) -> Iterator[Dict]:
+        """Transcribe with the local model from `offset` seconds on, yielding segments without ids"""
+        language = language or self.language
+        print(f"Starting transcription of: {audio_path} in {language}")
+        if offset or self.pcm_cache is not None:
+            audio = self.load_audio(audio_path, offset)
+        else:
+            audio = audio_path  # faster-whisper decodes the file itself
+        # Short clips have too few chunks to fill a batch
+        pipeline = self.get_batched() if self.use_batched(audio_path) else None
+        if pipeline is not None:
+            segments, duration, speech_duration = transcribe_with_vad(
+                pipeline, audio, language, self.decode_options, self.vad_options,
+                batch_size=self.batch_size)
+        else:
+            segments, duration, speech_duration = transcribe_with_vad(
+                self.model, audio, language, self.decode_options, self.vad_options)
+        
+        # The model decodes lazily, one window at a time, while we iterate
+        for segment in segments:
+            # Only add segments that have actual content
+            if segment.text.strip():
+                yield self.segment_to_dict(segment, offset=offset)
+            if progress_callback and duration:
+                progress_callback(min(100, int((offset + segment.end) / (offset + duration) * 100)))
+        
+        self.vad_stats.record(duration, speech_duration)
+        if duration:
+            print(f"VAD skipped {(duration - speech_duration) / duration:.0%} of {duration:.0f}s")
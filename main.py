@@ -13,6 +13,7 @@ from ui.main_window import MainWindow
 
 def main():
     # Use spawn method instead of fork
+    multiprocessing.freeze_support()  # Transcription worker in the bundled app
     multiprocessing.set_start_method('spawn', force=True)
     
     app = QApplication(sys.argv)
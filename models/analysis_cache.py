@@ -0,0 +1,141 @@
+# models/analysis_cache.py
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class AnalysisCache:
+    """Size-bounded store for AI analysis results
+
+    Entries are keyed by a hash of the text, both languages and the model
+    that produced them, and live in their own SQLite database so they are
+    never part of the review state. Lookups read single rows on demand,
+    with a small in-memory LRU in front. When the store grows past
+    max_entries or max_bytes the least recently used entries are evicted.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 5000,
+                 max_bytes: int = 50 * 1024 * 1024, memory_entries: int = 64):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.memory = OrderedDict()   # key -> analysis, most recently used last
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        self.count, self.total_bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+
+    @staticmethod
+    def make_key(text: str, learning_lang: str, native_lang: str, model: str) -> str:
+        """Content address of an analysis"""
+        payload = json.dumps([text, learning_lang, native_lang, model], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Look up an analysis, None on a miss"""
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key]
+
+            row = self.conn.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            with self.conn:
+                self.conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            analysis = json.loads(row[0])
+            self.remember(key, analysis)
+            return analysis
+
+    def put(self, key: str, analysis: Dict):
+        """Store an analysis, evicting old entries if the store is full"""
+        value = json.dumps(analysis, ensure_ascii=False)
+        size = len(value.encode('utf-8'))
+        with self.lock:
+            with self.conn:
+                old = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, value, size, time.time())
+                )
+                if old:
+                    self.total_bytes -= old[0]
+                else:
+                    self.count += 1
+                self.total_bytes += size
+                self.evict()
+            self.remember(key, analysis)
+
+    def delete(self, key: str):
+        """Remove an analysis"""
+        with self.lock:
+            self.memory.pop(key, None)
+            with self.conn:
+                row = self.conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self.count -= 1
+                    self.total_bytes -= row[0]
+
+    def remember(self, key: str, analysis: Dict):
+        """Keep a decoded analysis in the in-memory LRU"""
+        self.memory[key] = analysis
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def evict(self):
+        """Drop least recently used entries until the store is within its limits"""
+        while self.count > self.max_entries or self.total_bytes > self.max_bytes:
+            excess = max(self.count - self.max_entries, 1)
+            rows = self.conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_used LIMIT ?", (excess,)).fetchall()
+            if not rows:
+                break
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key, _ in rows])
+            for key, size in rows:
+                self.memory.pop(key, None)
+                self.count -= 1
+                self.total_bytes -= size
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': self.count,
+            'bytes': self.total_bytes
+        }
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,340 @@
+# models/cards.py
+
+from collections.abc import MutableMapping
+from datetime import date, datetime
+from typing import Iterator, List, Mapping
+
+import numpy as np
+
+from .snapshot import CardSnapshot
+
+
+class Card(MutableMapping):
+    """Dict-like view of one CardTable row
+
+    Reads and writes go straight to the table's columns. When the row is
+    removed the view keeps a detached copy of its fields, so widgets still
+    holding the card keep working.
+    """
+
+    __slots__ = ('table', 'row', 'data')
+
+    def __init__(self, table: 'CardTable', row: int):
+        self.table = table
+        self.row = row
+        self.data = None
+
+    def __getitem__(self, key):
+        if self.table is None:
+            return self.data[key]
+        return self.table.get_field(self.row, key)
+
+    def __setitem__(self, key, value):
+        if self.table is None:
+            self.data[key] = value
+        else:
+            self.table.set_field(self.row, key, value)
+
+    def __delitem__(self, key):
+        if self.table is None:
+            del self.data[key]
+        else:
+            self.table.delete_field(self.row, key)
+
+    def __iter__(self) -> Iterator[str]:
+        if self.table is None:
+            return iter(self.data)
+        return iter(self.table.row_keys(self.row))
+
+    def __len__(self) -> int:
+        return len(self.data) if self.table is None else len(self.table.row_keys(self.row))
+
+    def __repr__(self):
+        return f"Card({dict(self)!r})"
+
+    def detach(self):
+        """Copy the fields out of the table and stop referring to it"""
+        self.data = {key: self[key] for key in self}
+        self.table = None
+
+
+class CardTable:
+    """Column store for active cards
+
+    Scheduling fields live in NumPy arrays indexed by row, text and ids in
+    side lists, and the repeated audio_path/url/language strings are
+    interned. Rows of removed cards are reused. Fields the table has no
+    column for are kept per row in `extra`. After load_snapshot the text
+    of a card is decoded from the snapshot on first access.
+    """
+
+    # Array columns and their dtypes. next_review is epoch seconds,
+    # last_review_day a date ordinal (0 = never reviewed), the string
+    # columns hold indexes into self.strings and the transcription
+    # confidence columns are NaN for cards without one.
+    COLUMNS = {
+        'next_review': np.float64,
+        'interval': np.float64,
+        'ease': np.float64,
+        'start_time': np.float64,
+        'end_time': np.float64,
+        'reviews': np.int32,
+        'last_review_day': np.int32,
+        'audio_path': np.int32,
+        'url': np.int32,
+        'language': np.int32,
+        'avg_logprob': np.float64,
+        'no_speech_prob': np.float64,
+        'active': np.bool_,
+    }
+    FLOAT_FIELDS = ('interval', 'ease', 'start_time', 'end_time')
+    CONFIDENCE_FIELDS = ('avg_logprob', 'no_speech_prob')
+    STRING_FIELDS = ('audio_path', 'url', 'language')
+    FIELDS = ('id', 'text', 'audio_path', 'url', 'start_time', 'end_time',
+              'next_review', 'interval', 'ease', 'reviews', 'language',
+              'last_review_date')
+    DEFAULTS = {'text': '', 'audio_path': '', 'url': '', 'start_time': 0.0,
+                'end_time': 0.0, 'interval': 0, 'ease': 2.5, 'reviews': 0,
+                'language': None}
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = 0
+        self.size = 0          # rows in use, including free ones
+        self.columns = {name: np.zeros(0, dtype) for name, dtype in self.COLUMNS.items()}
+        self.ids = []
+        self.text = []
+        self.views = []
+        self.extra = {}        # row -> fields without a column
+        self.free = []
+        self.strings = []
+        self.string_ids = {}
+        self.snapshot = None   # CardSnapshot still holding undecoded text
+        self.grow(capacity)
+
+    def __len__(self) -> int:
+        return self.size - len(self.free)
+
+    def grow(self, capacity: int):
+        """Make room for at least `capacity` rows"""
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, 2 * self.capacity)
+        for name, column in self.columns.items():
+            grown = np.zeros(capacity, column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+        self.capacity = capacity
+
+    def intern(self, value) -> int:
+        """Index of a string in the intern table, adding it if needed"""
+        index = self.string_ids.get(value)
+        if index is None:
+            index = self.string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def append(self, card: Mapping) -> Card:
+        """Store a card and return a view of its row"""
+        if self.free:
+            row = self.free.pop()
+        else:
+            row = self.size
+            self.grow(row + 1)
+            self.size += 1
+            self.ids.append(None)
+            self.text.append(None)
+            self.views.append(None)
+
+        self.columns['active'][row] = True
+        self.columns['last_review_day'][row] = 0
+        for key in self.CONFIDENCE_FIELDS:
+            self.columns[key][row] = np.nan
+        for key, value in self.DEFAULTS.items():
+            self.set_field(row, key, card.get(key, value))
+        for key, value in card.items():
+            if key not in self.DEFAULTS:
+                self.set_field(row, key, value)
+        if 'next_review' not in card:
+            self.set_field(row, 'next_review', datetime.now())
+
+        view = self.views[row] = Card(self, row)
+        return view
+
+    def remove(self, card: Card):
+        """Remove a card's row, detaching its view"""
+        row = card.row
+        card.detach()
+        self.columns['active'][row] = False
+        self.ids[row] = None
+        self.text[row] = None
+        self.views[row] = None
+        self.extra.pop(row, None)
+        self.free.append(row)
+
+    def clear(self):
+        """Remove all cards"""
+        for view in self.views:
+            if view is not None:
+                view.detach()
+        self.columns['active'][:self.size] = False
+        self.size = 0
+        self.ids, self.text, self.views = [], [], []
+        self.extra = {}
+        self.free = []
+        self.release_snapshot()
+
+    def load_snapshot(self, snapshot: CardSnapshot) -> List[Card]:
+        """Replace all cards with those of a snapshot and return their views in order"""
+        self.clear()
+        count = snapshot.count
+        self.grow(count)
+        for name, column in self.columns.items():
+            column[:count] = True if name == 'active' else snapshot.column(name)
+        self.size = count
+        self.ids = snapshot.decode_ids()
+        self.text = [None] * count
+        self.extra = dict(snapshot.extra)
+        self.strings = list(snapshot.strings)
+        self.string_ids = {value: index for index, value in enumerate(self.strings)}
+        self.snapshot = snapshot
+        self.views = [Card(self, row) for row in range(count)]
+        return list(self.views)
+
+    def write_snapshot(self, path, rows: List[int], generation: int):
+        """Write the given rows, in order, to a CardSnapshot file"""
+        rows = np.asarray(rows, dtype=np.int64)
+        index = rows.tolist()
+        # Decodes any text still left in the mapped snapshot, which is then
+        # released so the file can be replaced
+        text = [self.get_field(row, 'text') for row in index]
+        self.release_snapshot()
+        CardSnapshot.write(
+            path,
+            columns={name: column[rows] for name, column in self.columns.items() if name != 'active'},
+            ids=[self.ids[row] for row in index],
+            text=text,
+            strings=self.strings,
+            extra={i: self.extra[row] for i, row in enumerate(index) if row in self.extra},
+            generation=generation
+        )
+
+    def release_snapshot(self):
+        """Decode all remaining text and close the snapshot mapping"""
+        if self.snapshot is None:
+            return
+        for row, text in enumerate(self.text):
+            if text is None and self.columns['active'][row]:
+                self.text[row] = self.snapshot.decode_text(row)
+        self.snapshot.close()
+        self.snapshot = None
+
+    # Row access for Card views
+
+    def get_field(self, row: int, key: str):
+        """Read one field of a row"""
+        if key == 'id':
+            return self.ids[row]
+        if key == 'text':
+            text = self.text[row]
+            if text is None and self.snapshot is not None:
+                text = self.text[row] = self.snapshot.decode_text(row)
+            return text
+        if key == 'next_review':
+            return datetime.fromtimestamp(self.columns['next_review'][row])
+        if key in self.FLOAT_FIELDS:
+            return float(self.columns[key][row])
+        if key == 'reviews':
+            return int(self.columns['reviews'][row])
+        if key in self.STRING_FIELDS:
+            return self.strings[self.columns[key][row]]
+        if key == 'last_review_date':
+            day = int(self.columns['last_review_day'][row])
+            if day == 0:
+                raise KeyError(key)
+            return date.fromordinal(day).isoformat()
+        if key in self.CONFIDENCE_FIELDS:
+            value = float(self.columns[key][row])
+            if np.isnan(value):
+                raise KeyError(key)
+            return value
+        return self.extra.get(row, {})[key]
+
+    def set_field(self, row: int, key: str, value):
+        """Write one field of a row"""
+        if key == 'id':
+            self.ids[row] = value
+        elif key == 'text':
+            self.text[row] = value
+        elif key == 'next_review':
+            if isinstance(value, str):
+                value = datetime.fromisoformat(value)
+            if isinstance(value, datetime):
+                value = value.timestamp()
+            self.columns['next_review'][row] = value
+        elif key in self.FLOAT_FIELDS or key == 'reviews':
+            self.columns[key][row] = value
+        elif key in self.STRING_FIELDS:
+            self.columns[key][row] = self.intern(value)
+        elif key == 'last_review_date':
+            self.columns['last_review_day'][row] = (
+                date.fromisoformat(value).toordinal() if value else 0)
+        elif key in self.CONFIDENCE_FIELDS:
+            self.columns[key][row] = np.nan if value is None else value
+        else:
+            self.extra.setdefault(row, {})[key] = value
+
+    def delete_field(self, row: int, key: str):
+        """Delete an optional field of a row"""
+        if key == 'last_review_date' and self.columns['last_review_day'][row]:
+            self.columns['last_review_day'][row] = 0
+        elif key in self.CONFIDENCE_FIELDS and not np.isnan(self.columns[key][row]):
+            self.columns[key][row] = np.nan
+        elif key in self.extra.get(row, {}):
+            del self.extra[row][key]
+        else:
+            raise KeyError(key)
+
+    def row_keys(self, row: int) -> List[str]:
+        """Field names present in a row"""
+        keys = list(self.FIELDS)
+        if self.columns['last_review_day'][row] == 0:
+            keys.pop()
+        keys += [key for key in self.CONFIDENCE_FIELDS if not np.isnan(self.columns[key][row])]
+        return keys + list(self.extra.get(row, ()))
+
+    # Vectorized queries over all active rows
+
+    def active_mask(self) -> np.ndarray:
+        """Boolean mask of rows holding a card"""
+        return self.columns['active'][:self.size]
+
+    def count(self) -> int:
+        """Number of active cards"""
+        return int(np.count_nonzero(self.active_mask()))
+
+    def count_due(self, now_ts: float) -> int:
+        """Number of reviewed cards whose next review is at or before `now_ts`"""
+        n = self.size
+        return int(np.count_nonzero(self.active_mask()
+                                    & (self.columns['reviews'][:n] > 0)
+                                    & (self.columns['next_review'][:n] <= now_ts)))
+
+    def count_new(self) -> int:
+        """Number of cards that were never reviewed"""
+        return int(np.count_nonzero(self.active_mask() & (self.columns['reviews'][:self.size] == 0)))
+
+    def count_first_reviews(self, day: str) -> int:
+        """Number of cards whose single review so far happened on `day`"""
+        n = self.size
+        return int(np.count_nonzero(
+            self.active_mask()
+            & (self.columns['reviews'][:n] == 1)
+            & (self.columns['last_review_day'][:n] == date.fromisoformat(day).toordinal())))
+
+    def reset_progress(self, now_ts: float):
+        """Mark every active card as new, due at `now_ts`"""
+        mask = self.active_mask()
+        self.columns['next_review'][:self.size][mask] = now_ts
+        self.columns['interval'][:self.size][mask] = 0
+        self.columns['ease'][:self.size][mask] = 2.5
+        self.columns['reviews'][:self.size][mask] = 0
@@ -0,0 +1,96 @@
+# models/journal.py
+
+import json
+import os
+from collections.abc import Mapping
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+class ReviewJournal:
+    """Append-only log of ReviewSystem changes made since the last snapshot"""
+
+    def __init__(self, path: str, compact_threshold: int = 1024 * 1024):
+        self.path = Path(path)
+        self.pending_path = self.path.with_name(self.path.name + '.compacting')
+        self.compact_threshold = compact_threshold
+        self.file = None
+
+    @staticmethod
+    def encode_value(value):
+        """JSON encoder for values json can't handle natively"""
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, Mapping):
+            # Card views of the column store
+            return dict(value)
+        raise TypeError(f"Cannot journal value of type {type(value).__name__}")
+
+    def encode(self, event: Dict) -> bytes:
+        """Serialize an event to a journal line"""
+        line = json.dumps(event, ensure_ascii=False, default=self.encode_value) + '\n'
+        return line.encode('utf-8')
+
+    def append(self, event: Dict):
+        """Append one event and make sure it reached the disk"""
+        self.write([self.encode(event)])
+
+    def write(self, lines: List[bytes]):
+        """Append encoded events with a single sync"""
+        if self.file is None:
+            self.file = open(self.path, 'ab')
+        self.file.write(b''.join(lines))
+        self.file.flush()
+        # fdatasync skips the metadata flush, which is all we need for an append
+        getattr(os, 'fdatasync', os.fsync)(self.file.fileno())
+
+    def size(self) -> int:
+        """Size of the active journal in bytes"""
+        if self.file is not None:
+            return self.file.tell()
+        return self.path.stat().st_size if self.path.exists() else 0
+
+    def needs_compaction(self) -> bool:
+        """Check whether the journal has grown past the compaction threshold"""
+        return self.size() >= self.compact_threshold
+
+    def rotate(self) -> Optional[Path]:
+        """Move the active journal aside for compaction and return its path
+
+        A journal left over from an unfinished compaction is returned first,
+        so its events are never overwritten. Returns None if there is nothing
+        to compact.
+        """
+        if self.pending_path.exists():
+            return self.pending_path
+
+        self.close()
+        if self.size() == 0:
+            return None
+
+        os.replace(self.path, self.pending_path)
+        return self.pending_path
+
+    def read(self, path: Path) -> Iterator[Dict]:
+        """Read events from a journal file in order"""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash mid-append leaves at most one truncated line
+                    print(f"Skipping truncated journal entry in {path}")
+
+    def discard(self):
+        """Drop all journal files once their events are part of a snapshot"""
+        self.close()
+        for path in (self.path, self.pending_path):
+            if path.exists():
+                path.unlink()
+
+    def close(self):
+        """Close the active journal file"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
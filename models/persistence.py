@@ -0,0 +1,77 @@
+# models/persistence.py
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class StateWriter:
+    """Write-behind persistence for ReviewSystem
+
+    Mutations submit already-encoded journal lines and return immediately.
+    A background thread appends everything submitted since its last run with
+    a single sync, at most once per interval. Events submitted with a key
+    replace any pending event with the same key, so repeated settings or
+    stats updates during a burst cost one write.
+    """
+
+    def __init__(self, journal, interval_ms: int = 500,
+                 on_flush: Optional[Callable[[], None]] = None):
+        self.journal = journal
+        self.interval = interval_ms / 1000
+        self.on_flush = on_flush
+        self.pending = []  # (key, line) pairs in submission order
+        self.lock = threading.Lock()
+        # Held while writing so a forced flush never interleaves with the thread
+        self.flush_lock = threading.RLock()
+        self.dirty = threading.Event()
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="state-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, line: bytes, key: str = None):
+        """Queue an encoded event and mark the state dirty"""
+        with self.lock:
+            if key is not None:
+                self.pending = [p for p in self.pending if p[0] != key]
+            self.pending.append((key, line))
+            self.dirty.set()
+
+    def run(self):
+        while self.running:
+            self.dirty.wait()
+            if not self.running:
+                break
+            # Let a burst of mutations accumulate before writing
+            time.sleep(self.interval)
+            self.flush()
+
+    def flush(self):
+        """Write all pending events now"""
+        with self.flush_lock:
+            with self.lock:
+                lines: List[bytes] = [line for _, line in self.pending]
+                self.pending = []
+                self.dirty.clear()
+            if not lines:
+                return
+
+            try:
+                self.journal.write(lines)
+            except Exception as e:
+                print(f"Error writing journal: {e}")
+                # Keep the events so the next flush retries them
+                with self.lock:
+                    self.pending = [(None, line) for line in lines] + self.pending
+                    self.dirty.set()
+                return
+
+            if self.on_flush:
+                self.on_flush()
+
+    def close(self):
+        """Flush pending events and stop the writer thread"""
+        self.running = False
+        self.dirty.set()
+        self.thread.join()
+        self.flush()
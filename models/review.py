@@ -1,18 +1,41 @@
 # models/review.py
 
-from datetime import datetime, timedelta
-from typing import List, Dict
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Dict
 import json
+import hashlib
 from pathlib import Path
 from collections import defaultdict
 import time
+import random
+import threading
 import traceback
+from itertools import islice
+import numpy as np
+from .storage import StateStore
+from .journal import ReviewJournal
+from .persistence import StateWriter
+from .scheduling import DueQueue, DeckCounters
+from .cards import CardTable
+from .snapshot import CardSnapshot
+from .analysis_cache import AnalysisCache
+from .word_sidecar import WordSidecar
 
 class ReviewSystem:
-    def __init__(self, storage_path: str = "./data"):
+    # Journal events that carry the full current value of their target, so a
+    # pending one can be replaced by a newer one instead of writing both
+    COALESCED_EVENTS = ('settings', 'stats')
+    # Card fields that come from transcription, the rest is review state
+    SEGMENT_FIELDS = ('text', 'start_time', 'end_time', 'avg_logprob', 'no_speech_prob')
+
+    def __init__(self, storage_path: str = "./data", flush_interval_ms: int = 500,
+                 debug: bool = False, on_source_deleted: Callable[[str], None] = None):
         self.storage_path = Path(storage_path)
         self.storage_path.mkdir(parents=True, exist_ok=True)
         
+        # In debug mode get_stats verifies its counters against a full scan
+        self.debug = debug
+        
         # Initialize settings with language support
         self.settings = {
             'daily_new_cards': 20,
@@ -21,9 +44,21 @@ class ReviewSystem:
             'native_language': 'en',      # Default to English
         }
         
-        self.items = []
-        self.skipped_cards = []
-        self.analysis_cache = {}  # Add this to store AI analysis results
+        # Active cards are stored column-wise in the table, self.cards maps
+        # their ids to dict-like row views and keeps insertion order
+        self.table = CardTable()
+        self.cards = {}
+        self.skipped = {}
+        
+        # Source records and their active cards, keyed by audio path
+        self.sources = {}
+        self.source_cards = {}
+        
+        # Reviewed cards ordered by next review, new cards in FIFO order
+        self.due_queue = DueQueue()
+        
+        # Due/new/total counts for get_stats
+        self.counters = DeckCounters()
 
         
         # Initialize statistics
@@ -40,28 +75,269 @@ class ReviewSystem:
         from audio_processors.ai_service import AIHelper
         self.ai_helper = AIHelper()
         
+        # AI analysis results, kept apart from the review state
+        self.analysis_cache = AnalysisCache(self.storage_path / 'analysis.db')
+        
+        # SQLite snapshot plus an append-only journal of changes made since.
+        # Mutations only append to the journal, which is folded into the
+        # snapshot in the background once it grows past its threshold.
+        self.store = StateStore(self.storage_path / 'state.db')
+        self.journal = ReviewJournal(self.storage_path / 'journal.log')
+        self.compaction_thread = None
+        
+        # Binary copy of the active cards, written on close so the next
+        # start can skip reading them from SQLite
+        self.snapshot_path = self.storage_path / 'cards.snapshot'
+        
+        # Word timestamps live in one memory-mapped sidecar file per source,
+        # outside the review state, and are only mapped when first read
+        self.words_dir = self.storage_path / 'words'
+        self.words_dir.mkdir(exist_ok=True)
+        self.word_sidecars = {}                   # audio_path -> WordSidecar or None
+        self.pending_words = defaultdict(list)    # audio_path -> segments not written yet
+        
+        # Called with the audio path of a deleted source, to drop the files
+        # kept for it outside the review data
+        self.on_source_deleted = on_source_deleted
+        
+        # Journal writes happen on a background thread, off the UI event loop
+        self.writer = StateWriter(self.journal, flush_interval_ms, on_flush=self.after_flush)
+        
         # Load existing state
         try:
             self.load_state()
         except Exception as e:
             print(f"Could not load state: {e}")
             
-        print(f"Review system initialized with {len(self.items)} items")
+        print(f"Review system initialized with {len(self.cards)} items")
+
+    @property
+    def items(self) -> List[Dict]:
+        """Active cards in insertion order"""
+        return list(self.cards.values())
+
+    @items.setter
+    def items(self, items: List[Dict]):
+        self.table.clear()
+        self.cards = {}
+        for item in items:
+            if item['id'] in self.cards:
+                self.table.remove(self.cards[item['id']])
+            self.cards[item['id']] = self.table.append(item)
+        self.rebuild_indexes()
+
+    @property
+    def skipped_cards(self) -> List[Dict]:
+        """Skipped cards in the order they were skipped"""
+        return list(self.skipped.values())
+
+    @skipped_cards.setter
+    def skipped_cards(self, cards: List[Dict]):
+        self.skipped = {card['id']: card for card in cards}
+
+    def make_source_record(self, audio_path: str, source_info: Dict = None) -> Dict:
+        """Create a source record, deriving missing details from the path and url"""
+        source_info = source_info or {}
+        url = source_info.get('url') or ''
+        return {
+            'audio_path': audio_path,
+            'title': source_info.get('title') or Path(audio_path).stem,
+            'type': source_info.get('type') or ('youtube' if 'youtube.com' in url else 'podcast'),
+            'url': url,
+            'language': source_info.get('language'),
+            'card_count': 0,
+            'reviewed_count': 0
+        }
+
+    def index_card(self, card: Dict):
+        """Add an active card to the source index, due queue and counters"""
+        self.due_queue.add(card)
+        self.counters.add(card)
+        audio_path = card['audio_path']
+        record = self.sources.get(audio_path)
+        if record is None:
+            record = self.sources[audio_path] = self.make_source_record(
+                audio_path, {'url': card.get('url', '')})
+        self.source_cards.setdefault(audio_path, {})[card['id']] = card
+        record['card_count'] += 1
+        if card.get('reviews', 0) > 0:
+            record['reviewed_count'] += 1
+
+    def unindex_card(self, card: Dict):
+        """Remove an active card from the source index, due queue and counters"""
+        self.due_queue.remove(card['id'])
+        self.counters.remove(card)
+        audio_path = card['audio_path']
+        if self.source_cards.get(audio_path, {}).pop(card['id'], None) is None:
+            return
+        record = self.sources[audio_path]
+        record['card_count'] -= 1
+        if card.get('reviews', 0) > 0:
+            record['reviewed_count'] -= 1
+
+    def rebuild_indexes(self):
+        """Rebuild the source index, due queue and counters from the active cards"""
+        # Work on the table columns in card order instead of card by card
+        ids = list(self.cards)
+        columns = self.table.columns
+        rows = np.fromiter((card.row for card in self.cards.values()), np.int64, len(ids))
+        reviews = columns['reviews'][rows]
+        paths = columns['audio_path'][rows]
+
+        reviewed = np.flatnonzero(reviews > 0)
+        reviewed_cards = list(zip(columns['next_review'][rows[reviewed]].tolist(),
+                                  [ids[i] for i in reviewed.tolist()]))
+        self.due_queue.load([ids[i] for i in np.flatnonzero(reviews == 0).tolist()], reviewed_cards)
+
+        first_review_days = columns['last_review_day'][rows[reviews == 1]]
+        days, counts = np.unique(first_review_days[first_review_days > 0], return_counts=True)
+        self.counters.load(
+            len(ids) - len(reviewed),
+            reviewed_cards,
+            {date.fromordinal(day).isoformat(): count
+             for day, count in zip(days.tolist(), counts.tolist())}
+        )
+
+        self.source_cards = {}
+        strings = self.table.strings
+        for (card_id, card), path in zip(self.cards.items(), paths.tolist()):
+            self.source_cards.setdefault(strings[path], {})[card_id] = card
+        reviewed_per_path = np.bincount(paths[reviewed], minlength=len(strings))
+        for record in self.sources.values():
+            record['card_count'] = 0
+            record['reviewed_count'] = 0
+        for audio_path, cards in self.source_cards.items():
+            record = self.sources.get(audio_path)
+            if record is None:
+                record = self.sources[audio_path] = self.make_source_record(
+                    audio_path, {'url': next(iter(cards.values())).get('url', '')})
+            record['card_count'] = len(cards)
+            record['reviewed_count'] = int(reviewed_per_path[self.table.string_ids[audio_path]])
 
     def get_cached_analysis(self, text: str, learning_lang: str, native_lang: str) -> Dict:
         """Get cached analysis or generate new one"""
-        cache_key = f"{text}:{learning_lang}:{native_lang}"
-        
-        if cache_key in self.analysis_cache:
+        analysis = self.lookup_analysis(text, learning_lang, native_lang)
+        if analysis is not None:
             print("Using cached analysis")
-            return self.analysis_cache[cache_key]
+            return analysis
         
         # Generate new analysis
         print("Generating new analysis")
         analysis = self.ai_helper.generate_analysis(text, learning_lang, native_lang)
-        self.analysis_cache[cache_key] = analysis
+        self.cache_analysis(text, learning_lang, native_lang, analysis)
         return analysis
 
+    def analysis_key(self, text: str, learning_lang: str, native_lang: str) -> str:
+        """Cache key of an analysis by the current AI model"""
+        return AnalysisCache.make_key(text, learning_lang, native_lang, self.ai_helper.model)
+
+    def lookup_analysis(self, text: str, learning_lang: str, native_lang: str) -> Dict:
+        """Get a cached analysis without generating one, None if there is none"""
+        return self.analysis_cache.get(self.analysis_key(text, learning_lang, native_lang))
+
+    def cache_analysis(self, text: str, learning_lang: str, native_lang: str, analysis: Dict):
+        """Store an analysis result in the cache"""
+        self.analysis_cache.put(self.analysis_key(text, learning_lang, native_lang), analysis)
+
+    def discard_analysis(self, text: str, learning_lang: str, native_lang: str):
+        """Remove a cached analysis so it gets generated again"""
+        self.analysis_cache.delete(self.analysis_key(text, learning_lang, native_lang))
+
+    def migrate_analysis_cache(self, legacy: Dict):
+        """Move analyses stored with the review state into the analysis cache"""
+        for cache_key, analysis in legacy.items():
+            text, learning_lang, native_lang = cache_key.rsplit(':', 2)
+            self.cache_analysis(text, learning_lang, native_lang, analysis)
+        self.store.clear_analysis_cache()
+        print(f"Moved {len(legacy)} cached analyses to {self.analysis_cache.db_path}")
+
+    def record(self, op: str, **data):
+        """Queue a change for the journal and mark the state dirty"""
+        # Encode right away so the writer thread gets a consistent copy
+        line = self.journal.encode({'op': op, **data})
+        self.writer.submit(line, key=op if op in self.COALESCED_EVENTS else None)
+
+    def after_flush(self):
+        """Called by the writer thread after it appended to the journal"""
+        if self.journal.needs_compaction():
+            self.start_compaction()
+
+    def flush(self):
+        """Write all pending changes to disk now"""
+        self.writer.flush()
+
+    def close(self):
+        """Flush pending changes, write the card snapshot and release the storage"""
+        self.writer.close()
+        self.wait_for_compaction()
+        try:
+            # The snapshot is only valid for a store with the journal folded in
+            self.replay_journal()
+            self.save_snapshot()
+        except Exception as e:
+            print(f"Error writing card snapshot: {e}")
+        self.save_words()
+        for audio_path in list(self.word_sidecars):
+            self.release_sidecar(audio_path)
+        self.journal.close()
+        self.store.close()
+        self.analysis_cache.close()
+
+    def save_snapshot(self):
+        """Write the active cards to the binary snapshot used at startup"""
+        self.table.write_snapshot(
+            self.snapshot_path,
+            [card.row for card in self.cards.values()],
+            self.store.generation()
+        )
+
+    def scalar_stats(self) -> Dict:
+        """Statistics without the review history, which is journaled per day"""
+        return {k: v for k, v in self.stats.items() if k != 'review_history'}
+
+    def record_stats(self):
+        """Journal the scalar statistics"""
+        self.record('stats', stats=self.scalar_stats())
+
+    def start_compaction(self):
+        """Fold the journal into the snapshot on a background thread"""
+        # Must not race with journal appends, so only called from the writer
+        # thread or with its flush lock held
+        if self.compaction_thread and self.compaction_thread.is_alive():
+            return
+
+        pending = self.journal.rotate()
+        if pending is None:
+            return
+
+        def run():
+            try:
+                self.compact(pending)
+            except Exception as e:
+                print(f"Error compacting journal: {e}")
+
+        self.compaction_thread = threading.Thread(target=run, name="journal-compaction")
+        self.compaction_thread.start()
+
+    def compact(self, pending: Path):
+        """Apply a rotated journal file to the snapshot and remove it"""
+        count = self.store.apply_events(self.journal.read(pending))
+        pending.unlink()
+        print(f"Compacted {count} journal events into {self.store.db_path}")
+
+    def replay_journal(self):
+        """Apply all journal files to the snapshot right away"""
+        pending = self.journal.rotate()
+        while pending:
+            self.compact(pending)
+            pending = self.journal.rotate()
+
+    def wait_for_compaction(self):
+        """Block until a running background compaction has finished"""
+        if self.compaction_thread:
+            self.compaction_thread.join()
+            self.compaction_thread = None
+
 
     def check_daily_limit(self) -> Dict:
         """Check if daily limit has been reached"""
@@ -71,7 +347,7 @@ class ReviewSystem:
         if self.settings.get('last_study_date') != today:
             self.settings['extra_cards_today'] = 0
             self.settings['last_study_date'] = today
-            self.save_state()
+            self.record('settings', settings=self.settings)
 
         total_today = self.stats.get('today_reviews', 0)
         daily_limit = self.settings.get('daily_limit', 20)
@@ -86,13 +362,13 @@ class ReviewSystem:
     def continue_beyond_limit(self):
         """Track that user is continuing beyond limit"""
         self.settings['extra_cards_today'] += 1
-        self.save_state()
+        self.record('settings', settings=self.settings)
 
     def process_review(self, item_id: str, response: str):
         """Process a review response with enhanced error handling"""
         try:
             # Find the item
-            item = next((i for i in self.items if i['id'] == item_id), None)
+            item = self.cards.get(item_id)
             if not item:
                 print(f"Card {item_id} not found")
                 return
@@ -126,6 +402,9 @@ class ReviewSystem:
             self.stats['review_history'][today]['ratings'][response] += 1
             self.update_streak()
 
+            was_new = item.get('reviews', 0) == 0
+            self.counters.remove(item)
+
             # Update interval based on response
             current_interval = item.get('interval', 0)
             current_ease = item.get('ease', 2.5)
@@ -157,11 +436,21 @@ class ReviewSystem:
             item['reviews'] = new_reviews
             if response != 'again' or item.get('reviews', 0) > 0:
                 item['last_review_date'] = today
+            if was_new and new_reviews > 0:
+                self.sources[item['audio_path']]['reviewed_count'] += 1
+            self.due_queue.add(item)
+            self.counters.add(item)
 
             print(f"Updated card: interval={new_interval}, ease={new_ease}, reviews={new_reviews}")
             
             # Save changes
-            self.save_state()
+            # Statistics were already queued by update_streak()
+            self.record(
+                'review',
+                card=item,
+                day=today,
+                history=self.stats['review_history'][today]
+            )
 
         except Exception as e:
             print(f"Error in process_review: {str(e)}")
@@ -172,42 +461,66 @@ class ReviewSystem:
     def load_state(self):
         """Load state and settings from disk"""
         try:
+            # One-time migration of the legacy JSON state file
             state_file = self.storage_path / 'state.json'
-            if state_file.exists():
-                with open(state_file, 'r', encoding='utf-8') as f:
-                    state = json.load(f)
-                    
-                    # Load items with language info
-                    self.items = [{
-                        **item,
-                        'next_review': datetime.fromisoformat(item['next_review']),
-                        'language': item.get('language', self.settings['learning_language'])
-                    } for item in state.get('items', [])]
-                    
-                    # Load skipped cards
-                    self.skipped_cards = [{
-                        **card,
-                        'next_review': datetime.fromisoformat(card['next_review']),
-                        'language': card.get('language', self.settings['learning_language'])
-                    } for card in state.get('skipped_cards', [])]
-                    
-                    # Update settings
-                    saved_settings = state.get('settings', {})
-                    self.settings.update(saved_settings)
-                    
-                    # Load statistics
-                    saved_stats = state.get('stats', {})
-                    self.stats.update(saved_stats)
+            if state_file.exists() and self.store.is_empty():
+                self.store.migrate_from_json(state_file)
 
-                    # Load analysis cache
-                    self.analysis_cache = state.get('analysis_cache', {})
-                    
-                print(f"Loaded {len(self.items)} items from {state_file}")
+            # Replay journal entries left since the last snapshot
+            self.replay_journal()
+
+            # Active cards come from the binary snapshot if it was taken
+            # of the current store, otherwise from SQLite
+            snapshot = CardSnapshot.read(self.snapshot_path)
+            if snapshot is not None and snapshot.generation != self.store.generation():
+                print("Card snapshot is out of date, loading cards from the database")
+                snapshot.close()
+                snapshot = None
+
+            state = self.store.load(include_items=snapshot is None)
+            
+            # Load source records, card counts are rebuilt from the items
+            self.sources = {
+                source['audio_path']: self.make_source_record(source['audio_path'], source)
+                for source in state.get('sources', [])
+            }
+            
+            if snapshot is not None:
+                views = self.table.load_snapshot(snapshot)
+                self.cards = dict(zip(self.table.ids, views))
+                self.rebuild_indexes()
+            else:
+                # Load items with language info, the table parses next_review
+                self.items = [{
+                    **item,
+                    'language': item.get('language') or self.settings['learning_language']
+                } for item in state.get('items', [])]
+            
+            # Load skipped cards
+            self.skipped_cards = [{
+                **card,
+                'next_review': datetime.fromisoformat(card['next_review']),
+                'language': card.get('language') or self.settings['learning_language']
+            } for card in state.get('skipped_cards', [])]
+            
+            # Update settings
+            saved_settings = state.get('settings', {})
+            self.settings.update(saved_settings)
+            
+            # Load statistics
+            saved_stats = state.get('stats', {})
+            self.stats.update(saved_stats)
+
+            # Analyses saved by older versions move to their own store
+            if state.get('analysis_cache'):
+                self.migrate_analysis_cache(state['analysis_cache'])
+                
+            print(f"Loaded {len(self.cards)} items from {self.store.db_path}")
         except Exception as e:
             print(f"Error loading state: {str(e)}")
+            self.sources = {}
             self.items = []
             self.skipped_cards = []
-            self.analysis_cache = {}  # Initialize empty cache on error
             
 
     def start_session(self):
@@ -219,7 +532,8 @@ class ReviewSystem:
         if self.stats['session_start']:
             self.stats['study_time'] += time.time() - self.stats['session_start']
             self.stats['session_start'] = None
-            self.save_state()
+            self.record_stats()
+            self.flush()
 
     def update_streak(self):
         """Update study streak"""
@@ -235,7 +549,7 @@ class ReviewSystem:
                 self.stats['streak'] = 1
                 
             self.stats['last_review_date'] = datetime.now().isoformat()
-            self.save_state()
+            self.record_stats()
         except Exception as e:
             print(f"Error updating streak: {e}")
 
@@ -260,13 +574,16 @@ class ReviewSystem:
                 'text': item.get('text', ''),
                 'id': item.get('id', '')
             }
-            for item in self.items 
-            if item['audio_path'] == audio_path
+            for item in self.source_cards.get(audio_path, {}).values()
         ]
         
         # Sort by start time
         segments.sort(key=lambda x: x['start'])
         return segments
+
+    def get_source_cards(self, audio_path: str) -> List[Dict]:
+        """Get the active cards of a source in insertion order"""
+        return list(self.source_cards.get(audio_path, {}).values())
     
     def add_source(self, source_info: dict, segments: List[dict]):
         """Add new audio source and its segments with language info"""
@@ -275,6 +592,20 @@ class ReviewSystem:
             if not segments:
                 raise ValueError("No segments provided")
             
+            # Create or refresh the source record, keeping its card counts
+            audio_path = source_info['audio_path']
+            record = self.make_source_record(audio_path, source_info)
+            # Language detected during transcription, if the segments carry it
+            record['language'] = next((segment['language'] for segment in segments
+                                       if segment.get('language')), record['language'])
+            if audio_path in self.sources:
+                record['card_count'] = self.sources[audio_path]['card_count']
+                record['reviewed_count'] = self.sources[audio_path]['reviewed_count']
+                record['language'] = record['language'] or self.sources[audio_path].get('language')
+            self.sources[audio_path] = record
+            
+            added = []
+            updated_skipped = []
             for segment in segments:
                 if not segment['text'].strip():
                     continue
@@ -290,39 +621,121 @@ class ReviewSystem:
                     'interval': 0,
                     'ease': 2.5,
                     'reviews': 0,
-                    'language': self.settings['learning_language']  # Add language info
+                    'language': (segment.get('language') or record['language']
+                                 or self.settings['learning_language'])
                 }
+                # Transcription confidence, for segments that carry it
+                for key in ('avg_logprob', 'no_speech_prob'):
+                    if segment.get(key) is not None:
+                        card[key] = segment[key]
                 
                 if self.validate_card(card):
-                    self.items.append(card)
+                    existing = self.cards.get(card['id'])
+                    if existing is None:
+                        existing = self.skipped.get(card['id'])
+                    if existing is not None:
+                        # Resumed jobs send checkpointed segments again, keep
+                        # the review progress and skip status of their cards
+                        for key in self.SEGMENT_FIELDS:
+                            if key in card:
+                                existing[key] = card[key]
+                        card = existing
+                        if card['id'] in self.skipped:
+                            updated_skipped.append(card)
+                        else:
+                            added.append(card)
+                    else:
+                        card = self.cards[card['id']] = self.table.append(card)
+                        self.index_card(card)
+                        added.append(card)
+                    if segment.get('words'):
+                        self.pending_words[audio_path].append({
+                            'id': card['id'],
+                            'words': segment['words'],
+                            'avg_logprob': segment.get('avg_logprob'),
+                            'no_speech_prob': segment.get('no_speech_prob')
+                        })
                 else:
                     print(f"Invalid card data: {card}")
             
             print(f"Added {len(segments)} segments to review system")
-            self.save_state()
+            self.record(
+                'add_source',
+                source={k: record[k] for k in ('audio_path', 'title', 'type', 'url', 'language')},
+                cards=added,
+                skipped_cards=updated_skipped
+            )
             
         except Exception as e:
             print(f"Error adding source: {str(e)}")
             raise Exception(f"Failed to add source: {str(e)}")
 
 
+    def words_path(self, audio_path: str) -> Path:
+        """Word sidecar file of a source"""
+        return self.words_dir / f"{hashlib.sha1(audio_path.encode('utf-8')).hexdigest()}.words"
+
+    def get_sidecar(self, audio_path: str):
+        """Mapped word sidecar of a source, None if it has none"""
+        if audio_path not in self.word_sidecars:
+            self.word_sidecars[audio_path] = WordSidecar.read(self.words_path(audio_path))
+        return self.word_sidecars[audio_path]
+
+    def release_sidecar(self, audio_path: str):
+        """Unmap a source's word sidecar"""
+        sidecar = self.word_sidecars.pop(audio_path, None)
+        if sidecar is not None:
+            sidecar.close()
+
+    def save_words(self, audio_path: str = None):
+        """Write word timestamps added since the last call to the sidecars of their sources"""
+        audio_paths = [audio_path] if audio_path is not None else list(self.pending_words)
+        for path in audio_paths:
+            pending = self.pending_words.pop(path, None)
+            if not pending:
+                continue
+            try:
+                # Merge with what the sidecar already holds, new segments win
+                sidecar = self.get_sidecar(path)
+                replaced = {segment['id'] for segment in pending}
+                kept = [segment for segment in sidecar.segments()
+                        if segment['id'] not in replaced] if sidecar else []
+                self.release_sidecar(path)
+                WordSidecar.write(self.words_path(path), kept + pending)
+            except Exception as e:
+                print(f"Error writing word timestamps of {path}: {e}")
+
+    def get_words(self, card_id: str) -> List[Dict]:
+        """Word timestamps of a card, empty if none were recorded"""
+        card = self.cards.get(card_id) or self.skipped.get(card_id)
+        if card is None:
+            return []
+        audio_path = card['audio_path']
+        for segment in reversed(self.pending_words.get(audio_path, ())):
+            if segment['id'] == card_id:
+                return segment['words']
+        sidecar = self.get_sidecar(audio_path)
+        if sidecar is None or card_id not in sidecar:
+            return []
+        return sidecar.words(card_id)
+
     def skip_card(self, card_id: str):
         """Temporarily skip a card and show it again later"""
         try:
             # Find and remove the card from main items
-            card = next((c for c in self.items if c['id'] == card_id), None)
+            card = self.cards.pop(card_id, None)
             if card:
-                # Remove from main items
-                self.items = [item for item in self.items if item['id'] != card_id]
+                self.unindex_card(card)
+                self.table.remove(card)
                 
                 # Add to skipped cards if not already there
-                if not any(s['id'] == card_id for s in self.skipped_cards):
-                    self.skipped_cards.append(card)
+                if card_id not in self.skipped:
+                    self.skipped[card_id] = dict(card)
                     print(f"Card {card_id} skipped, will show again later")
                 else:
                     print(f"Card {card_id} already in skipped cards")
                     
-                self.save_state()  # Save the state after modification
+                self.record('skip', id=card_id)  # Save the state after modification
             else:
                 print(f"Card {card_id} not found")
         except Exception as e:
@@ -332,10 +745,10 @@ class ReviewSystem:
     def edit_card_text(self, card_id: str, new_text: str):
         """Edit card text"""
         try:
-            card = next((c for c in self.items if c['id'] == card_id), None)
+            card = self.cards.get(card_id)
             if card:
                 card['text'] = new_text.strip()
-                self.save_state()
+                self.record('edit', id=card_id, text=card['text'])
                 print(f"Card {card_id} text updated")
             else:
                 print(f"Card {card_id} not found")
@@ -347,12 +760,12 @@ class ReviewSystem:
         """Delete individual card"""
         try:
             print(f"Deleting card: {card_id}")
-            original_count = len(self.items)
-            self.items = [item for item in self.items if item['id'] != card_id]
-            deleted_count = original_count - len(self.items)
-            if deleted_count > 0:
-                self.save_state()
-                print(f"Card deleted, remaining cards: {len(self.items)}")
+            card = self.cards.pop(card_id, None)
+            if card is not None:
+                self.unindex_card(card)
+                self.table.remove(card)
+                self.record('delete', id=card_id)
+                print(f"Card deleted, remaining cards: {len(self.cards)}")
             else:
                 print(f"Card {card_id} not found")
         except Exception as e:
@@ -365,11 +778,13 @@ class ReviewSystem:
             'daily_new_cards': self.settings.get('daily_new_cards', 20),
             'cards_per_session': self.settings.get('cards_per_session', 3),
             'learning_language': self.settings.get('learning_language', 'ja'),
-            'native_language': self.settings.get('native_language', 'en')
+            'native_language': self.settings.get('native_language', 'en'),
+            'detect_language': self.settings.get('detect_language', False)
         }
 
     def update_settings(self, daily_new_cards: int, cards_per_session: int,
-                       learning_language: str = None, native_language: str = None):
+                       learning_language: str = None, native_language: str = None,
+                       detect_language: bool = None):
         """Update settings including language preferences"""
         try:
             self.settings['daily_new_cards'] = daily_new_cards
@@ -380,52 +795,55 @@ class ReviewSystem:
                 self.settings['learning_language'] = learning_language
             if native_language is not None:
                 self.settings['native_language'] = native_language
+            if detect_language is not None:
+                self.settings['detect_language'] = detect_language
             
-            self.save_state()
+            self.record('settings', settings=self.settings)
             print(f"Settings updated: {self.settings}")
         except Exception as e:
             print(f"Error updating settings: {e}")
             raise Exception(f"Failed to update settings: {str(e)}")
 
+    def get_transcription_tuning(self, model_size: str) -> Dict:
+        """Calibrated transcription settings for a model size, None before calibration"""
+        return self.settings.get('transcription_tuning', {}).get(model_size)
+
+    def set_transcription_tuning(self, model_size: str, tuning: Dict):
+        """Save calibrated transcription settings for a model size"""
+        try:
+            self.settings.setdefault('transcription_tuning', {})[model_size] = tuning
+            self.record('settings', settings=self.settings)
+            print(f"Transcription tuning saved for {model_size}: {tuning}")
+        except Exception as e:
+            print(f"Error saving transcription tuning: {e}")
+            raise Exception(f"Failed to save transcription tuning: {str(e)}")
+
+    def get_remaining_new(self, today: str = None) -> int:
+        """Number of new cards that may still be introduced today"""
+        today = today or datetime.now().date().isoformat()
+        new_cards_today = self.stats['review_history'].get(today, {}).get('new_cards_reviewed', 0)
+        return max(0, self.settings.get('daily_new_cards', 20) - new_cards_today)
+
     def get_due_items(self, limit: int = None):
         """Get items due for review"""
         try:
             now = datetime.now()
             today = now.date().isoformat()
-            cards_per_session = self.settings.get('cards_per_session', 3)
+            limit = limit or self.settings.get('cards_per_session', 3)
             
-            # Get new cards studied today from stats
-            new_cards_today = self.stats['review_history'].get(today, {}).get('new_cards_reviewed', 0)
-            print(f"New cards studied today: {new_cards_today}")  # Debug print
+            # Most overdue cards, O(limit log n)
+            due_cards = [self.cards[card_id]
+                         for card_id in islice(self.due_queue.iter_due(now.timestamp()), limit)]
             
-            # Get daily new cards limit
-            new_cards_limit = self.settings.get('daily_new_cards', 20)
-            print(f"Daily new cards limit: {new_cards_limit}")  # Debug print
-
-            # If we've reached the daily limit, only show due cards
-            if new_cards_today >= new_cards_limit:
-                print("Daily limit reached, showing only due cards")  # Debug print
-                items_to_show = [item for item in self.items 
-                            if item['reviews'] > 0 and item['next_review'] <= now]
-            else:
-                # Get due and new cards
-                due_cards = [item for item in self.items 
-                            if item['reviews'] > 0 and item['next_review'] <= now]
-                new_cards = [item for item in self.items if item['reviews'] == 0]
-                
-                # Calculate remaining new cards allowed
-                remaining_new = new_cards_limit - new_cards_today
-                print(f"Remaining new cards allowed: {remaining_new}")  # Debug print
-                
-                # Combine cards
-                items_to_show = due_cards.copy()
-                if remaining_new > 0:
-                    items_to_show.extend(new_cards[:remaining_new])
+            # New cards allowed by the daily limit
+            remaining_new = self.get_remaining_new(today)
+            new_cards = [self.cards[card_id]
+                         for card_id in islice(self.due_queue.iter_new(), min(limit, remaining_new))]
 
-            # Shuffle and limit
-            import random
+            # Mix due and new cards, then limit
+            items_to_show = due_cards + new_cards
             random.shuffle(items_to_show)
-            return items_to_show[:cards_per_session]
+            return items_to_show[:limit]
                 
         except Exception as e:
             print(f"Error getting due items: {e}")
@@ -445,16 +863,18 @@ class ReviewSystem:
             }
 
             # Reset learning progress for all cards
-            for card in self.items:
-                card['next_review'] = datetime.now()
-                card['interval'] = 0
-                card['ease'] = 2.5
-                card['reviews'] = 0
+            now = datetime.now()
+            self.table.reset_progress(now.timestamp())
+            self.rebuild_indexes()
 
             # Clear skipped cards
-            self.skipped_cards = []
+            self.skipped = {}
 
-            self.save_state()
+            self.record(
+                'reset_progress',
+                next_review=now,
+                stats=self.scalar_stats()
+            )
             print("Statistics and learning progress reset successfully")
         except Exception as e:
             print(f"Error resetting stats: {e}")
@@ -466,29 +886,45 @@ class ReviewSystem:
             now = datetime.now()
             new_cards_limit = self.settings.get('daily_new_cards', 20)
             
-            # Get all due and new cards
-            due_cards = [i for i in self.items 
-                        if i.get('reviews', 0) > 0 and i.get('next_review', now) <= now]
-            new_cards = [i for i in self.items if i.get('reviews', 0) == 0]
-            
             # Count new cards studied today
-            new_cards_today = len([i for i in self.items 
-                                 if i.get('reviews', 0) == 1 and 
-                                 i.get('last_review_date') == now.date().isoformat()])
-            
+            new_cards_today = self.counters.count_first_reviews(now.date().isoformat())
             remaining_new = max(0, new_cards_limit - new_cards_today)
 
             stats = {
-                'due': len(due_cards),
-                'new': min(len(new_cards), remaining_new),
-                'total': len(self.items)
+                'due': self.counters.count_due(now.timestamp()),
+                'new': min(self.counters.new, remaining_new),
+                'total': self.counters.total
             }
+            if self.debug:
+                self.verify_counters(now)
             print(f"Current stats: {stats}")
             return stats
         except Exception as e:
             print(f"Error getting stats: {e}")
             return {'due': 0, 'new': 0, 'total': 0}
 
+    def verify_counters(self, now: datetime = None) -> bool:
+        """Check the maintained counters against a scan of the card table, rebuilding them on mismatch"""
+        now = now or datetime.now()
+        today = now.date().isoformat()
+        expected = {
+            'due': self.table.count_due(now.timestamp()),
+            'new': self.table.count_new(),
+            'first_reviews': self.table.count_first_reviews(today),
+            'total': self.table.count()
+        }
+        actual = {
+            'due': self.counters.count_due(now.timestamp()),
+            'new': self.counters.new,
+            'first_reviews': self.counters.count_first_reviews(today),
+            'total': self.counters.total
+        }
+        if actual != expected:
+            print(f"Counter mismatch, rebuilding: counted {actual}, expected {expected}")
+            self.rebuild_indexes()
+            return False
+        return True
+
     def get_detailed_stats(self) -> Dict:
         """Get detailed statistics"""
         try:
@@ -520,11 +956,12 @@ class ReviewSystem:
         """Get card distribution by source"""
         try:
             distribution = defaultdict(lambda: {'total': 0, 'reviewed': 0})
-            for item in self.items:
-                source = Path(item['audio_path']).stem
-                distribution[source]['total'] += 1
-                if item.get('reviews', 0) > 0:
-                    distribution[source]['reviewed'] += 1
+            for record in self.sources.values():
+                if record['card_count'] == 0:
+                    continue
+                source = Path(record['audio_path']).stem
+                distribution[source]['total'] += record['card_count']
+                distribution[source]['reviewed'] += record['reviewed_count']
             return dict(distribution)
         except Exception as e:
             print(f"Error getting source distribution: {e}")
@@ -533,23 +970,9 @@ class ReviewSystem:
     def get_sources(self) -> List[Dict]:
         """Get list of unique sources and their card counts"""
         try:
-            sources = {}
-            for item in self.items:
-                if item['audio_path'] not in sources:
-                    source_type = 'youtube' if 'youtube.com' in item.get('url', '') else 'podcast'
-                    sources[item['audio_path']] = {
-                        'audio_path': item['audio_path'],
-                        'title': Path(item['audio_path']).stem,
-                        'type': source_type,
-                        'card_count': 1,
-                        'reviewed_count': 1 if item.get('reviews', 0) > 0 else 0
-                    }
-                else:
-                    sources[item['audio_path']]['card_count'] += 1
-                    if item.get('reviews', 0) > 0:
-                        sources[item['audio_path']]['reviewed_count'] += 1
-            
-            return list(sources.values())
+            # Copies, so callers can't corrupt the maintained counts
+            return [dict(record) for record in self.sources.values()
+                    if record['card_count'] > 0]
         except Exception as e:
             print(f"Error getting sources: {e}")
             return []
@@ -558,12 +981,24 @@ class ReviewSystem:
         """Delete source and update stats"""
         try:
             print(f"Deleting source: {audio_path}")
-            cards_before = len(self.items)
-            self.items = [item for item in self.items if item['audio_path'] != audio_path]
-            cards_deleted = cards_before - len(self.items)
+            source_cards = self.source_cards.pop(audio_path, {})
+            for card_id, card in source_cards.items():
+                del self.cards[card_id]
+                self.due_queue.remove(card_id)
+                self.counters.remove(card)
+                self.table.remove(card)
+            self.sources.pop(audio_path, None)
+            cards_deleted = len(source_cards)
+            
+            # Drop the source's word timestamps
+            self.pending_words.pop(audio_path, None)
+            self.release_sidecar(audio_path)
+            self.words_path(audio_path).unlink(missing_ok=True)
+            if self.on_source_deleted is not None:
+                self.on_source_deleted(audio_path)
             
             # Reset stats if no items remain
-            if len(self.items) == 0:
+            if len(self.cards) == 0:
                 self.reset_stats()
             else:
                 # Update today's stats
@@ -579,38 +1014,71 @@ class ReviewSystem:
                 print(f"Warning: Could not delete audio file: {audio_path} - {e}")
             
             # Save the updated state
-            self.save_state()
-            print(f"Saved updated state with {len(self.items)} remaining cards")
+            self.record(
+                'delete_source',
+                audio_path=audio_path,
+                stats=self.scalar_stats()
+            )
+            print(f"Saved updated state with {len(self.cards)} remaining cards")
             
         except Exception as e:
             print(f"Error in delete_source: {e}")
             raise Exception(f"Failed to delete source: {str(e)}")
         
+    def get_state(self) -> Dict:
+        """The complete current state in the state.json layout"""
+        return {
+            'items': self.items,
+            'skipped_cards': self.skipped_cards,
+            'settings': self.settings,
+            'stats': {
+                **self.stats,
+                'review_history': dict(self.stats['review_history'])
+            },
+            'sources': list(self.sources.values())
+        }
+
     def save_state(self):
-        """Save current state and settings to disk"""
+        """Save the complete current state and settings to disk"""
         try:
-            state_file = self.storage_path / 'state.json'
-            state = {
-                'items': [{
-                    **item,
-                    'next_review': item['next_review'].isoformat()
-                } for item in self.items],
-                'skipped_cards': [{
-                    **card,
-                    'next_review': card['next_review'].isoformat()
-                } for card in self.skipped_cards],
-                'settings': self.settings,
-                'stats': {
-                    **self.stats,
-                    'review_history': dict(self.stats['review_history'])
-                },
-                'analysis_cache': self.analysis_cache  # Save analysis cache
-            }
+            state = self.get_state()
             
-            with open(state_file, 'w', encoding='utf-8') as f:
-                json.dump(state, f, ensure_ascii=False, indent=2)
+            # A full snapshot supersedes everything in the journal
+            with self.writer.flush_lock:
+                self.writer.flush()
+                self.wait_for_compaction()
+                self.store.replace_all(state)
+                self.journal.discard()
                 
         except Exception as e:
             print(f"Error saving state: {str(e)}")
             raise Exception(f"Failed to save state: {str(e)}")
 
+    def export_json(self, path: str):
+        """Export the complete state as a state.json file"""
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.get_state(), f, ensure_ascii=False, indent=2,
+                          default=self.journal.encode_value)
+            print(f"Exported {len(self.cards)} items to {path}")
+        except Exception as e:
+            print(f"Error exporting state: {str(e)}")
+            raise Exception(f"Failed to export state: {str(e)}")
+
+    def import_json(self, path: str):
+        """Replace the complete state with a state.json file"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            
+            with self.writer.flush_lock:
+                self.writer.flush()
+                self.wait_for_compaction()
+                self.store.replace_all(state)
+                self.journal.discard()
+            self.load_state()
+            print(f"Imported {len(self.cards)} items from {path}")
+        except Exception as e:
+            print(f"Error importing state: {str(e)}")
+            raise Exception(f"Failed to import state: {str(e)}")
+
@@ -0,0 +1,198 @@
+# models/scheduling.py
+
+import heapq
+import itertools
+from typing import Dict, Iterable, Iterator, Tuple
+
+
+class DueQueue:
+    """Priority queue of reviewed cards by next review time, plus a FIFO of new cards
+
+    Updates push a fresh heap entry and leave the old one behind. Stale
+    entries are recognised by their sequence number and skipped, and the
+    heap is rebuilt once they outnumber the live ones.
+    """
+
+    def __init__(self):
+        self.heap = []        # (next_review timestamp, seq, card_id)
+        self.entries = {}     # card_id -> (next_review timestamp, seq) of the live entry
+        self.new_cards = {}   # card_id -> None, dicts keep insertion order
+        self.counter = itertools.count()
+        self.version = 0
+
+    def __len__(self):
+        return len(self.entries) + len(self.new_cards)
+
+    def clear(self):
+        """Remove all cards"""
+        self.heap = []
+        self.entries = {}
+        self.new_cards = {}
+        self.version += 1
+
+    def load(self, new_ids: Iterable[str], reviewed: Iterable[Tuple[float, str]]):
+        """Replace the contents in one go from new card ids in FIFO order and
+        (next_review timestamp, card_id) pairs of reviewed cards"""
+        self.clear()
+        self.new_cards = dict.fromkeys(new_ids)
+        self.heap = [(ts, next(self.counter), card_id) for ts, card_id in reviewed]
+        self.entries = {card_id: (ts, seq) for ts, seq, card_id in self.heap}
+        heapq.heapify(self.heap)
+
+    def add(self, card: Dict):
+        """Add a card or reposition it after its schedule changed"""
+        card_id = card['id']
+        if card.get('reviews', 0) == 0:
+            # New cards keep their original position in the FIFO
+            if card_id not in self.new_cards:
+                self.entries.pop(card_id, None)
+                self.new_cards[card_id] = None
+                self.version += 1
+            return
+
+        self.new_cards.pop(card_id, None)
+        entry = (card['next_review'].timestamp(), next(self.counter))
+        self.entries[card_id] = entry
+        heapq.heappush(self.heap, (*entry, card_id))
+        self.version += 1
+
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.rebuild_heap()
+
+    def remove(self, card_id: str):
+        """Remove a card, its heap entry goes stale"""
+        removed = self.entries.pop(card_id, None) is not None
+        if card_id in self.new_cards:
+            del self.new_cards[card_id]
+            removed = True
+        if removed:
+            self.version += 1
+
+    def rebuild_heap(self):
+        """Drop stale heap entries"""
+        self.heap = [(ts, seq, card_id) for card_id, (ts, seq) in self.entries.items()]
+        heapq.heapify(self.heap)
+        self.version += 1
+
+    def iter_due(self, now_ts: float) -> Iterator[str]:
+        """Yield ids of reviewed cards due at `now_ts`, most overdue first
+
+        Walks the heap without popping it, so pulling k cards costs
+        O(k log k). The queue must not change while iterating.
+        """
+        heap = self.heap
+        version = self.version
+        frontier = [(heap[0], 0)] if heap else []
+        while frontier:
+            if self.version != version:
+                raise RuntimeError("DueQueue changed during iteration")
+            (ts, seq, card_id), index = heapq.heappop(frontier)
+            if ts > now_ts:
+                return
+            if self.entries.get(card_id, (None, None))[1] == seq:
+                yield card_id
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(heap):
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def iter_new(self) -> Iterator[str]:
+        """Yield ids of new cards in the order they were added"""
+        return iter(self.new_cards)
+
+
+class DeckCounters:
+    """Card counts for ReviewSystem.get_stats, maintained on every mutation
+
+    Reviewed cards are bucketed by the minute of their next review. Buckets
+    that lie entirely in the past are folded into a single due count the
+    next time it is read, so cards becoming due over time are promoted
+    without rescanning the deck. Only the current minute's bucket is
+    inspected card by card.
+
+    A card must be removed with the same field values it was added with,
+    so callers remove it before changing its schedule and add it again
+    afterwards.
+    """
+
+    BUCKET_SECONDS = 60
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Reset all counts"""
+        self.total = 0
+        self.new = 0
+        self.first_reviews = {}    # day -> cards with exactly one review, last reviewed that day
+        self.buckets = {}          # bucket -> {card_id: next_review timestamp}, not promoted yet
+        self.bucket_heap = []      # keys of self.buckets
+        self.card_buckets = {}     # card_id -> bucket of every reviewed card
+        self.horizon = float('-inf')  # buckets before this one have been promoted
+        self.promoted = 0          # cards in promoted buckets
+
+    def load(self, new: int, reviewed: Iterable[Tuple[float, str]], first_reviews: Dict[str, int]):
+        """Replace all counts in one go from the number of new cards,
+        (next_review timestamp, card_id) pairs of reviewed cards and the
+        first review counts per day"""
+        self.clear()
+        self.new = new
+        self.first_reviews = dict(first_reviews)
+        for ts, card_id in reviewed:
+            bucket = int(ts // self.BUCKET_SECONDS)
+            self.card_buckets[card_id] = bucket
+            self.buckets.setdefault(bucket, {})[card_id] = ts
+        self.bucket_heap = list(self.buckets)
+        heapq.heapify(self.bucket_heap)
+        self.total = new + len(self.card_buckets)
+
+    def add(self, card: Dict):
+        """Count a card"""
+        self.total += 1
+        if card.get('reviews', 0) == 0:
+            self.new += 1
+            return
+
+        if card.get('reviews') == 1 and card.get('last_review_date'):
+            day = card['last_review_date']
+            self.first_reviews[day] = self.first_reviews.get(day, 0) + 1
+
+        ts = card['next_review'].timestamp()
+        bucket = int(ts // self.BUCKET_SECONDS)
+        self.card_buckets[card['id']] = bucket
+        if bucket < self.horizon:
+            self.promoted += 1
+            return
+        if bucket not in self.buckets:
+            self.buckets[bucket] = {}
+            heapq.heappush(self.bucket_heap, bucket)
+        self.buckets[bucket][card['id']] = ts
+
+    def remove(self, card: Dict):
+        """Stop counting a card"""
+        self.total -= 1
+        if card.get('reviews', 0) == 0:
+            self.new -= 1
+            return
+
+        if card.get('reviews') == 1 and card.get('last_review_date'):
+            self.first_reviews[card['last_review_date']] -= 1
+
+        bucket = self.card_buckets.pop(card['id'])
+        if bucket < self.horizon:
+            self.promoted -= 1
+        else:
+            del self.buckets[bucket][card['id']]
+
+    def count_due(self, now_ts: float) -> int:
+        """Number of reviewed cards whose next review is at or before `now_ts`"""
+        current = int(now_ts // self.BUCKET_SECONDS)
+        while self.bucket_heap and self.bucket_heap[0] < current:
+            self.promoted += len(self.buckets.pop(heapq.heappop(self.bucket_heap)))
+        self.horizon = max(self.horizon, current)
+
+        partial = self.buckets.get(current, {})
+        return self.promoted + sum(1 for ts in partial.values() if ts <= now_ts)
+
+    def count_first_reviews(self, day: str) -> int:
+        """Number of cards whose single review so far happened on `day`"""
+        return self.first_reviews.get(day, 0)
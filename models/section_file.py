@@ -0,0 +1,129 @@
+# models/section_file.py
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class SectionFile:
+    """Memory-mapped file of numpy sections, the container of the binary caches
+
+    Layout: magic, uint32 header length, JSON header, then one section per
+    array, each aligned to 8 bytes. The header holds the format version
+    and, under 'sections', [dtype, offset, length] per array, with offsets
+    relative to the 8-byte aligned end of the header. Subclasses set MAGIC,
+    VERSION and KIND, and add their own fields to the header.
+    """
+
+    MAGIC = b''
+    VERSION = 0
+    KIND = "section file"
+
+    def __init__(self, header: dict, buffer: mmap.mmap, data_start: int):
+        self.buffer = buffer
+        self.offsets = {name: data_start + offset
+                        for name, (dtype, offset, length) in header['sections'].items()}
+        self.sections = {
+            name: np.frombuffer(buffer, dtype=np.dtype(dtype), count=length,
+                                offset=self.offsets[name])
+            for name, (dtype, offset, length) in header['sections'].items()
+        }
+
+    def close(self):
+        """Release the mapping"""
+        self.sections = {}
+        self.buffer.close()
+
+    @classmethod
+    def read(cls, path: Path):
+        """Map a file, None if it is missing, damaged or of another format version"""
+        path = Path(path)
+        if not path.exists() or path.stat().st_size == 0:
+            return None
+        with open(path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        header = cls.read_header(path, buffer)
+        if header is None:
+            buffer.close()
+            return None
+        start = len(cls.MAGIC) + 4
+        header_length, = struct.unpack('<I', buffer[len(cls.MAGIC):start])
+        return cls(header, buffer, cls.align(start + header_length))
+
+    @classmethod
+    def read_header(cls, path: Path, buffer: mmap.mmap) -> Optional[dict]:
+        """The header if it is valid and its sections lie within the file"""
+        start = len(cls.MAGIC) + 4
+        if buffer[:len(cls.MAGIC)] != cls.MAGIC or len(buffer) < start:
+            print(f"Ignoring {path}: not a {cls.KIND}")
+            return None
+        header_length, = struct.unpack('<I', buffer[len(cls.MAGIC):start])
+        try:
+            header = json.loads(buffer[start:start + header_length])
+        except ValueError:
+            print(f"Ignoring {path}: damaged {cls.KIND} header")
+            return None
+        if header.get('version') != cls.VERSION:
+            print(f"Ignoring {path}: {cls.KIND} version {header.get('version')}")
+            return None
+        data_start = cls.align(start + header_length)
+        for dtype, offset, length in header['sections'].values():
+            if data_start + offset + np.dtype(dtype).itemsize * length > len(buffer):
+                print(f"Ignoring {path}: truncated {cls.KIND}")
+                return None
+        return header
+
+    @classmethod
+    def write_sections(cls, path: Path, header: dict, arrays: Dict[str, np.ndarray]):
+        """Atomically write the arrays after `header`, which gets the version and section table"""
+        header = {**header, 'version': cls.VERSION, 'sections': {}}
+        offset = 0
+        for name, array in arrays.items():
+            header['sections'][name] = [array.dtype.str, offset, len(array)]
+            offset = cls.align(offset + array.nbytes)
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        data_start = cls.align(len(cls.MAGIC) + 4 + len(header_bytes))
+
+        path = Path(path)
+        temp_path = path.with_name(path.name + '.tmp')
+        with open(temp_path, 'wb') as f:
+            f.write(cls.MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes)
+            for name, array in arrays.items():
+                f.seek(data_start + header['sections'][name][1])
+                f.write(np.ascontiguousarray(array).tobytes())
+            f.truncate(data_start + offset)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def pack_strings(values: List[str]):
+        """Encode strings to an offsets table and a UTF-8 blob"""
+        encoded = [value.encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return offsets, np.frombuffer(b''.join(encoded), np.uint8)
+
+    @staticmethod
+    def pack_ids(ids: List[str]) -> np.ndarray:
+        """NUL separated UTF-8 blob of ids"""
+        id_blob = '\0'.join(ids)
+        if id_blob.count('\0') != max(len(ids) - 1, 0):
+            raise ValueError("Card ids must not contain NUL characters")
+        return np.frombuffer(id_blob.encode('utf-8'), np.uint8)
+
+    def unpack_ids(self, count: int) -> List[str]:
+        """The ids of the 'ids' section"""
+        if count == 0:
+            return []
+        return self.sections['ids'].tobytes().decode('utf-8').split('\0')
+
+    @staticmethod
+    def align(offset: int) -> int:
+        """Round up to a multiple of 8"""
+        return (offset + 7) & ~7
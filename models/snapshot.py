@@ -0,0 +1,61 @@
+# models/snapshot.py
+
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from .section_file import SectionFile
+
+
+class CardSnapshot(SectionFile):
+    """Versioned binary snapshot of the active cards, memory-mapped on load
+
+    A SectionFile. Numeric CardTable columns are stored as-is. Ids are a
+    NUL separated UTF-8 blob, decoded in one go at load. Text is a UTF-8
+    blob with an int64 offsets table, so a single entry can be decoded on
+    first access.
+
+    The header carries the StateStore generation the snapshot was taken
+    at. A snapshot with a different generation is stale and ignored.
+    """
+
+    MAGIC = b'SHZCARD\0'
+    VERSION = 2
+    KIND = "card snapshot"
+
+    def __init__(self, header: dict, buffer, data_start: int):
+        super().__init__(header, buffer, data_start)
+        self.generation = header['generation']
+        self.count = header['count']
+        self.strings = header['strings']
+        self.extra = {int(row): fields for row, fields in header['extra'].items()}
+
+    def column(self, name: str) -> np.ndarray:
+        """A CardTable column, read-only and backed by the file"""
+        return self.sections[name]
+
+    def decode_ids(self) -> List[str]:
+        """All card ids in row order"""
+        return self.unpack_ids(self.count)
+
+    def decode_text(self, row: int) -> str:
+        """Text of one card, read straight from the mapping"""
+        offsets = self.sections['text_offsets']
+        start = self.offsets['text_blob']
+        return self.buffer[start + int(offsets[row]):start + int(offsets[row + 1])].decode('utf-8')
+
+    @classmethod
+    def write(cls, path: Path, columns: dict, ids: List[str], text: List[str],
+              strings: list, extra: dict, generation: int):
+        """Atomically write a snapshot of `len(ids)` rows"""
+        text_offsets, text_blob = cls.pack_strings(text)
+        arrays = {**columns, 'ids': cls.pack_ids(ids),
+                  'text_offsets': text_offsets, 'text_blob': text_blob}
+        header = {
+            'generation': generation,
+            'count': len(ids),
+            'strings': strings,
+            'extra': {str(row): fields for row, fields in extra.items()}
+        }
+        cls.write_sections(path, header, arrays)
@@ -0,0 +1,388 @@
+# models/storage.py
+
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable
+
+
+class StateStore:
+    """SQLite storage engine for ReviewSystem state"""
+
+    SCHEMA_VERSION = 4
+
+    # Card fields that get their own column, everything else goes to `extra`
+    CARD_COLUMNS = ('id', 'text', 'audio_path', 'url', 'start_time', 'end_time',
+                    'next_review', 'interval', 'ease', 'reviews', 'language',
+                    'last_review_date')
+
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        # Autocommit mode, transactions are managed by transaction(). The
+        # connection is shared with the journal compaction thread.
+        self.conn = sqlite3.connect(str(self.db_path), isolation_level=None,
+                                    check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.lock = threading.RLock()
+        self.transaction_depth = 0
+        self.create_schema()
+
+    @contextmanager
+    def transaction(self):
+        """Group writes into one transaction, nested calls join the outer one"""
+        with self.lock:
+            if self.transaction_depth == 0:
+                self.conn.execute("BEGIN")
+            self.transaction_depth += 1
+            try:
+                yield self.conn
+            except Exception:
+                self.transaction_depth -= 1
+                if self.transaction_depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self.transaction_depth -= 1
+            if self.transaction_depth == 0:
+                self.conn.execute("COMMIT")
+
+    def create_schema(self):
+        """Create tables if they don't exist yet"""
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS cards (
+                id TEXT PRIMARY KEY,
+                skipped INTEGER NOT NULL DEFAULT 0,
+                text TEXT NOT NULL,
+                audio_path TEXT NOT NULL,
+                url TEXT,
+                start_time REAL,
+                end_time REAL,
+                next_review TEXT,
+                interval REAL,
+                ease REAL,
+                reviews INTEGER,
+                language TEXT,
+                last_review_date TEXT,
+                extra TEXT
+            );
+            CREATE INDEX IF NOT EXISTS cards_audio_path ON cards (audio_path);
+            CREATE TABLE IF NOT EXISTS sources (
+                audio_path TEXT PRIMARY KEY,
+                title TEXT,
+                type TEXT,
+                url TEXT,
+                language TEXT
+            );
+            CREATE TABLE IF NOT EXISTS settings (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS stats (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS review_history (
+                day TEXT PRIMARY KEY,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+        """)
+        # Columns added to tables that older versions already created
+        columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(sources)")}
+        if 'language' not in columns:
+            self.conn.execute("ALTER TABLE sources ADD COLUMN language TEXT")
+        self.conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def is_empty(self) -> bool:
+        """Check whether nothing has been stored yet"""
+        for table in ('cards', 'settings', 'stats'):
+            if self.conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                return False
+        return True
+
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
+
+    def generation(self) -> int:
+        """Counter bumped by every batch of writes, used to validate snapshots"""
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+            return row['value'] if row else 0
+
+    def bump_generation(self):
+        """Mark the stored state as changed"""
+        with self.transaction():
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('generation', 1) "
+                "ON CONFLICT(key) DO UPDATE SET value = value + 1")
+
+    # Cards
+
+    def card_to_row(self, card: Dict, skipped: bool = False) -> tuple:
+        """Convert a card dict to a row tuple for the cards table"""
+        extra = {k: v for k, v in card.items() if k not in self.CARD_COLUMNS}
+        next_review = card.get('next_review')
+        if isinstance(next_review, datetime):
+            next_review = next_review.isoformat()
+        return (
+            card['id'],
+            1 if skipped else 0,
+            card.get('text', ''),
+            card.get('audio_path', ''),
+            card.get('url', ''),
+            card.get('start_time'),
+            card.get('end_time'),
+            next_review,
+            card.get('interval', 0),
+            card.get('ease', 2.5),
+            card.get('reviews', 0),
+            card.get('language'),
+            card.get('last_review_date'),
+            json.dumps(extra, ensure_ascii=False) if extra else None
+        )
+
+    def row_to_card(self, row: sqlite3.Row) -> Dict:
+        """Convert a cards table row back to a card dict"""
+        card = {key: row[key] for key in self.CARD_COLUMNS}
+        if card['last_review_date'] is None:
+            del card['last_review_date']
+        if row['extra']:
+            card.update(json.loads(row['extra']))
+        return card
+
+    def upsert_cards(self, cards: Iterable[Dict], skipped: bool = False):
+        """Insert or update cards, keeping their original insertion order"""
+        columns = ('id', 'skipped') + self.CARD_COLUMNS[1:] + ('extra',)
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in columns[1:])
+        with self.transaction():
+            self.conn.executemany(
+                f"INSERT INTO cards ({', '.join(columns)}) VALUES ({placeholders}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}",
+                [self.card_to_row(card, skipped) for card in cards]
+            )
+
+    def upsert_card(self, card: Dict, skipped: bool = False):
+        """Insert or update a single card"""
+        self.upsert_cards([card], skipped)
+
+    def set_card_skipped(self, card_id: str):
+        """Move a card to the skipped list"""
+        with self.transaction():
+            self.conn.execute("UPDATE cards SET skipped = 1 WHERE id = ?", (card_id,))
+
+    def update_card_text(self, card_id: str, text: str):
+        """Replace the text of a card"""
+        with self.transaction():
+            self.conn.execute("UPDATE cards SET text = ? WHERE id = ?", (text, card_id))
+
+    def delete_card(self, card_id: str):
+        """Delete a single card"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM cards WHERE id = ? AND skipped = 0", (card_id,))
+
+    # Sources
+
+    def save_source(self, source: Dict):
+        """Insert or update a source record"""
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sources (audio_path, title, type, url, language) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (source['audio_path'], source.get('title'), source.get('type'), source.get('url', ''),
+                 source.get('language'))
+            )
+
+    def delete_source(self, audio_path: str):
+        """Delete a source record and all active cards of the source"""
+        with self.transaction():
+            self.conn.execute(
+                "DELETE FROM cards WHERE audio_path = ? AND skipped = 0", (audio_path,))
+            self.conn.execute("DELETE FROM sources WHERE audio_path = ?", (audio_path,))
+
+    def delete_skipped_cards(self):
+        """Delete all skipped cards"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM cards WHERE skipped = 1")
+
+    def reset_progress(self, next_review: str):
+        """Mark all active cards as new and drop skipped cards"""
+        with self.transaction():
+            self.conn.execute(
+                "UPDATE cards SET next_review = ?, interval = 0, ease = 2.5, reviews = 0 "
+                "WHERE skipped = 0", (next_review,))
+            self.delete_skipped_cards()
+
+    # Settings, stats and caches
+
+    def save_settings(self, settings: Dict):
+        """Persist settings"""
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v)) for k, v in settings.items()]
+            )
+
+    def save_stats(self, stats: Dict):
+        """Persist scalar statistics (review history is stored per day)"""
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO stats (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v)) for k, v in stats.items() if k != 'review_history']
+            )
+
+    def save_review_day(self, day: str, data: Dict):
+        """Persist one day of review history"""
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO review_history (day, data) VALUES (?, ?)",
+                (day, json.dumps(data))
+            )
+
+    def clear_review_history(self):
+        """Delete all review history"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM review_history")
+
+    def save_analysis(self, key: str, analysis: Dict):
+        """Persist a cached AI analysis"""
+        with self.transaction():
+            self.conn.execute(
+                "INSERT OR REPLACE INTO analysis_cache (key, value) VALUES (?, ?)",
+                (key, json.dumps(analysis, ensure_ascii=False))
+            )
+
+    def delete_analysis(self, key: str):
+        """Remove a cached AI analysis"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+
+    def clear_analysis_cache(self):
+        """Remove all AI analyses, once they moved to the AnalysisCache"""
+        with self.transaction():
+            self.conn.execute("DELETE FROM analysis_cache")
+
+    # Journal replay
+
+    def apply_event(self, event: Dict):
+        """Apply a single ReviewJournal event"""
+        op = event['op']
+        if op == 'add_source':
+            if 'source' in event:
+                self.save_source(event['source'])
+            self.upsert_cards(event['cards'])
+            self.upsert_cards(event.get('skipped_cards', []), skipped=True)
+        elif op == 'review':
+            self.upsert_card(event['card'])
+            self.save_review_day(event['day'], event['history'])
+            if 'stats' in event:
+                self.save_stats(event['stats'])
+        elif op == 'skip':
+            self.set_card_skipped(event['id'])
+        elif op == 'edit':
+            self.update_card_text(event['id'], event['text'])
+        elif op == 'delete':
+            self.delete_card(event['id'])
+        elif op == 'delete_source':
+            self.delete_source(event['audio_path'])
+            self.save_stats(event['stats'])
+        elif op == 'reset_progress':
+            self.reset_progress(event['next_review'])
+            self.clear_review_history()
+            self.save_stats(event['stats'])
+        elif op == 'settings':
+            self.save_settings(event['settings'])
+        elif op == 'stats':
+            self.save_stats(event['stats'])
+        elif op == 'analysis':
+            self.save_analysis(event['key'], event['analysis'])
+        else:
+            print(f"Ignoring unknown journal event: {op}")
+
+    def apply_events(self, events: Iterable[Dict]) -> int:
+        """Apply journal events in order within a single transaction"""
+        count = 0
+        with self.transaction():
+            for event in events:
+                self.apply_event(event)
+                count += 1
+            self.bump_generation()
+        return count
+
+    # Whole state
+
+    def load(self, include_items: bool = True) -> Dict:
+        """Load the whole state in the same shape as the old state.json
+
+        With include_items=False active cards are left out, for when they
+        come from a card snapshot.
+        """
+        with self.lock:
+            items, skipped_cards = [], []
+            query = "SELECT * FROM cards" + ("" if include_items else " WHERE skipped = 1")
+            for row in self.conn.execute(query + " ORDER BY rowid"):
+                (skipped_cards if row['skipped'] else items).append(self.row_to_card(row))
+
+            settings = {row['key']: json.loads(row['value'])
+                        for row in self.conn.execute("SELECT key, value FROM settings")}
+            stats = {row['key']: json.loads(row['value'])
+                     for row in self.conn.execute("SELECT key, value FROM stats")}
+            stats['review_history'] = {
+                row['day']: json.loads(row['data'])
+                for row in self.conn.execute("SELECT day, data FROM review_history")
+            }
+            analysis_cache = {row['key']: json.loads(row['value'])
+                              for row in self.conn.execute("SELECT key, value FROM analysis_cache")}
+            sources = [dict(row) for row in self.conn.execute("SELECT * FROM sources ORDER BY rowid")]
+
+            return {
+                'items': items,
+                'skipped_cards': skipped_cards,
+                'settings': settings,
+                'stats': stats,
+                'analysis_cache': analysis_cache,
+                'sources': sources
+            }
+
+    def replace_all(self, state: Dict):
+        """Replace the stored state with `state` in a single transaction"""
+        with self.transaction():
+            for table in ('cards', 'sources', 'settings', 'stats', 'review_history', 'analysis_cache'):
+                self.conn.execute(f"DELETE FROM {table}")
+            for source in state.get('sources', []):
+                self.save_source(source)
+            self.upsert_cards(state.get('items', []))
+            self.upsert_cards(state.get('skipped_cards', []), skipped=True)
+            self.save_settings(state.get('settings', {}))
+            stats = state.get('stats', {})
+            self.save_stats(stats)
+            for day, data in stats.get('review_history', {}).items():
+                self.save_review_day(day, data)
+            for key, analysis in state.get('analysis_cache', {}).items():
+                self.save_analysis(key, analysis)
+            self.bump_generation()
+
+    def migrate_from_json(self, state_file: Path):
+        """One-time import of a legacy state.json, which is kept as a backup"""
+        state_file = Path(state_file)
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+        self.replace_all(state)
+
+        backup = state_file.with_suffix('.json.migrated')
+        state_file.rename(backup)
+        print(f"Migrated {len(state.get('items', []))} items from {state_file} to {self.db_path}")
@@ -0,0 +1,85 @@
+# models/word_sidecar.py
+
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from .section_file import SectionFile
+
+
+class WordSidecar(SectionFile):
+    """Word timestamps and confidence of one source's segments, memory-mapped
+
+    A SectionFile, like CardSnapshot. Per segment there are the card id (NUL
+    separated blob), float32 avg_logprob/no_speech_prob (NaN if unknown)
+    and an int64 offset into the word arrays. Per word there are float32
+    start/end times and an int64 offset into a UTF-8 blob of the words.
+    """
+
+    MAGIC = b'SHZWORD\0'
+    VERSION = 1
+    KIND = "word sidecar"
+
+    def __init__(self, header: dict, buffer, data_start: int):
+        super().__init__(header, buffer, data_start)
+        self.count = header['count']
+        self.index = {card_id: i for i, card_id in enumerate(self.unpack_ids(self.count))}
+
+    def __contains__(self, card_id: str) -> bool:
+        return card_id in self.index
+
+    def words(self, card_id: str) -> List[Dict]:
+        """Words of a segment with their start/end times"""
+        i = self.index[card_id]
+        first, last = (int(n) for n in self.sections['word_offsets'][i:i + 2])
+        if first == last:
+            return []
+        text_offsets = self.sections['text_offsets'][first:last + 1]
+        blob_start = self.offsets['text_blob']
+        blob = self.buffer[blob_start + int(text_offsets[0]):blob_start + int(text_offsets[-1])]
+        bounds = (text_offsets - text_offsets[0]).tolist()
+        starts = self.sections['word_start'][first:last].tolist()
+        ends = self.sections['word_end'][first:last].tolist()
+        return [
+            {'word': blob[bounds[j]:bounds[j + 1]].decode('utf-8'), 'start': starts[j], 'end': ends[j]}
+            for j in range(last - first)
+        ]
+
+    def confidence(self, card_id: str) -> Dict:
+        """avg_logprob and no_speech_prob of a segment, None where unknown"""
+        i = self.index[card_id]
+        result = {}
+        for key in ('avg_logprob', 'no_speech_prob'):
+            value = float(self.sections[key][i])
+            result[key] = None if np.isnan(value) else value
+        return result
+
+    def segments(self) -> List[Dict]:
+        """All segments, as accepted by write()"""
+        return [{'id': card_id, 'words': self.words(card_id), **self.confidence(card_id)}
+                for card_id in self.index]
+
+    @classmethod
+    def write(cls, path: Path, segments: List[Dict]):
+        """Atomically write segments given as {'id', 'words', 'avg_logprob', 'no_speech_prob'}"""
+        words = [word for segment in segments for word in segment.get('words', [])]
+        word_offsets = np.zeros(len(segments) + 1, np.int64)
+        np.cumsum([len(segment.get('words', [])) for segment in segments], out=word_offsets[1:])
+        text_offsets, text_blob = cls.pack_strings([word['word'] for word in words])
+
+        def floats(values):
+            return np.array([np.nan if value is None else value for value in values], np.float32)
+
+        arrays = {
+            'ids': cls.pack_ids([segment['id'] for segment in segments]),
+            'avg_logprob': floats(segment.get('avg_logprob') for segment in segments),
+            'no_speech_prob': floats(segment.get('no_speech_prob') for segment in segments),
+            'word_offsets': word_offsets,
+            'word_start': floats(word['start'] for word in words),
+            'word_end': floats(word['end'] for word in words),
+            'text_offsets': text_offsets,
+            'text_blob': text_blob,
+        }
+
+        cls.write_sections(path, {'count': len(segments)}, arrays)
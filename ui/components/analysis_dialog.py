@@ -258,13 +258,17 @@ class AnalysisDialog(QDialog):
         """Start or retrieve the analysis"""
         try:
             settings = self.review_system.get_settings()
-            cache_key = f"{self.text}:{settings['learning_language']}:{settings['native_language']}"
             
             # Try to get from cache first
-            if hasattr(self.review_system, 'analysis_cache') and cache_key in self.review_system.analysis_cache:
+            cached = self.review_system.lookup_analysis(
+                self.text,
+                settings['learning_language'],
+                settings['native_language']
+            )
+            if cached is not None:
                 print("Using cached analysis")
                 self.loading.hide()
-                self.show_analysis(self.review_system.analysis_cache[cache_key])
+                self.show_analysis(cached)
                 return
 
             # If not in cache, start new analysis
@@ -287,21 +291,18 @@ class AnalysisDialog(QDialog):
         """Handle completed analysis and cache it"""
         try:
             settings = self.review_system.get_settings()
-            cache_key = f"{self.text}:{settings['learning_language']}:{settings['native_language']}"
             
-            # Initialize cache if it doesn't exist
-            if not hasattr(self.review_system, 'analysis_cache'):
-                self.review_system.analysis_cache = {}
-            
-            # Cache the result
-            self.review_system.analysis_cache[cache_key] = result
+            # Cache and persist the result
+            self.review_system.cache_analysis(
+                self.text,
+                settings['learning_language'],
+                settings['native_language'],
+                result
+            )
             
             # Show the analysis
             self.show_analysis(result)
             
-            # Save state to persist cache
-            self.review_system.save_state()
-            
         except Exception as e:
             self.show_error(str(e))
 
@@ -392,9 +393,11 @@ class AnalysisDialog(QDialog):
         
             # Clear from cache
             settings = self.review_system.get_settings()
-            cache_key = f"{self.text}:{settings['learning_language']}:{settings['native_language']}"
-            if cache_key in self.review_system.analysis_cache:
-                del self.review_system.analysis_cache[cache_key]
+            self.review_system.discard_analysis(
+                self.text,
+                settings['learning_language'],
+                settings['native_language']
+            )
         
             # Start new analysis
             self.content.hide()
@@ -96,10 +96,7 @@ class CardBrowserDialog(QDialog):
         """Load cards from the source"""
         try:
             # Get cards for this source
-            self.cards = [
-                card for card in self.review_system.items 
-                if card['audio_path'] == self.source_path
-            ]
+            self.cards = self.review_system.get_source_cards(self.source_path)
             
             # Update count
             self.count_label.setText(f"{len(self.cards)} cards")
@@ -151,8 +151,8 @@ class FocusReviewDialog(QDialog):
 
     def get_cards(self, random_order):
         cards = [
-            card for card in self.review_system.items 
-            if card['audio_path'] in self.sources
+            card for source in self.sources
+            for card in self.review_system.get_source_cards(source)
         ]
         if random_order:
             random.shuffle(cards)
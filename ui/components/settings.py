@@ -1,11 +1,42 @@
 # ui/components/settings.py
 
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QGroupBox, QFormLayout,
-                           QPushButton, QSpinBox, QMessageBox, QLabel, QComboBox)
-from PyQt6.QtCore import pyqtSignal, Qt
+                           QPushButton, QSpinBox, QMessageBox, QLabel, QComboBox, QCheckBox)
+from PyQt6.QtCore import pyqtSignal, Qt, QThread
+from datetime import datetime
+import os
+from audio_processors.tuner import Tuner, is_current, is_usable
+
+
+class TuningThread(QThread):
+    finished = pyqtSignal(dict)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(int)
+
+    def __init__(self, model_size, language):
+        super().__init__()
+        self.tuner = Tuner(model_size, language=language)
+        self.is_running = True
+
+    def run(self):
+        try:
+            tuning = self.tuner.run(progress_callback=self.progress.emit)
+            if tuning is not None and self.is_running:
+                self.finished.emit(tuning)
+        except Exception as e:
+            if self.is_running:
+                print(f"Tuning error: {str(e)}")
+                self.error.emit(str(e))
+
+    def stop(self):
+        """Stop the calibration, killing the run in progress"""
+        self.is_running = False
+        self.tuner.cancel()
+
 
 class Settings(QWidget):
     settingsChanged = pyqtSignal()
+    tuningChanged = pyqtSignal(dict)
 
     # Define available languages
     LANGUAGES = [
@@ -21,9 +52,11 @@ class Settings(QWidget):
         ("Indonesian", "id"),
     ]
 
-    def __init__(self, review_system):
+    def __init__(self, review_system, model_size="base"):
         super().__init__()
         self.review_system = review_system
+        self.model_size = model_size
+        self.tuning_thread = None
         self.setup_ui()
         self.load_current_settings()
 
@@ -107,6 +140,20 @@ class Settings(QWidget):
 
         language_layout.addRow(learning_label, self.learning_language)
         language_layout.addRow(native_label, self.native_language)
+
+        # Transcribe each source in its own language
+        self.detect_language = QCheckBox("Detect the language of each source")
+        self.detect_language.setToolTip(
+            "Detect the spoken language from the first 30 seconds of speech\n"
+            "instead of transcribing everything in the learning language."
+        )
+        self.detect_language.setStyleSheet("""
+            QCheckBox {
+                font-size: 14px;
+                color: #4b5563;
+            }
+        """)
+        language_layout.addRow("", self.detect_language)
         
         language_group.setLayout(language_layout)
         layout.addWidget(language_group)
@@ -193,6 +240,48 @@ class Settings(QWidget):
         study_group.setLayout(study_layout)
         layout.addWidget(study_group)
 
+        # Transcription performance group
+        tuning_group = QGroupBox("Transcription Performance")
+        tuning_group.setStyleSheet(language_group.styleSheet())  # Use same style
+
+        tuning_layout = QFormLayout()
+        tuning_layout.setSpacing(16)
+        tuning_layout.setContentsMargins(16, 24, 16, 16)
+
+        self.tuning_label = QLabel()
+        self.tuning_label.setWordWrap(True)
+        self.tuning_label.setStyleSheet(label_style)
+        tuning_layout.addRow(self.tuning_label)
+
+        self.tune_btn = QPushButton("Recalibrate")
+        self.tune_btn.setToolTip(
+            "Time a short clip with different thread and precision settings\n"
+            "and use the fastest for transcription on this computer."
+        )
+        self.tune_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.tune_btn.setStyleSheet("""
+            QPushButton {
+                background: #e5e7eb;
+                color: #374151;
+                border: none;
+                border-radius: 6px;
+                padding: 8px 16px;
+                font-size: 14px;
+                font-weight: 500;
+            }
+            QPushButton:hover {
+                background: #d1d5db;
+            }
+            QPushButton:disabled {
+                color: #9ca3af;
+            }
+        """)
+        self.tune_btn.clicked.connect(self.start_tuning)
+        tuning_layout.addRow("", self.tune_btn)
+
+        tuning_group.setLayout(tuning_layout)
+        layout.addWidget(tuning_group)
+
         # Description text
         description = QLabel(
             "Note: Due cards will always be shown regardless of settings, "
@@ -253,11 +342,96 @@ class Settings(QWidget):
                 self.learning_language.setCurrentIndex(learning_idx)
             if native_idx >= 0:
                 self.native_language.setCurrentIndex(native_idx)
+            self.detect_language.setChecked(settings.get('detect_language', False))
+
+            self.update_tuning_label()
                 
         except Exception as e:
             print(f"Error loading settings: {e}")
             QMessageBox.warning(self, "Warning", "Could not load current settings.")
 
+    def update_tuning_label(self):
+        """Show the calibrated transcription settings"""
+        tuning = self.review_system.get_transcription_tuning(self.model_size)
+        if not is_current(tuning):
+            self.tuning_label.setText(f"Transcription ({self.model_size} model) is not calibrated yet.")
+            return
+        if not is_usable(tuning):
+            self.tuning_label.setText(
+                f"Calibration of the {self.model_size} model failed ({tuning['tuned_at'][:10]}): "
+                f"{tuning['error']}\nUsing the default settings.")
+            return
+        workers = tuning['num_workers']
+        self.tuning_label.setText(
+            f"{self.model_size} model: {tuning['compute_type']}, "
+            f"{workers} worker{'s' if workers > 1 else ''} x {tuning['cpu_threads']} threads "
+            f"on {tuning['cpu_count']} cores.\n"
+            f"Transcribes at {tuning['rtf']:.2f}x real time (calibrated {tuning['tuned_at'][:10]})."
+        )
+
+    def start_tuning(self):
+        """Calibrate transcription settings in the background"""
+        if self.tuning_thread is not None and self.tuning_thread.isRunning():
+            return
+        self.tune_btn.setEnabled(False)
+        self.tuning_label.setText("Calibrating transcription speed...")
+        settings = self.review_system.get_settings()
+        language = 'auto' if settings['detect_language'] else settings['learning_language']
+        self.tuning_thread = TuningThread(self.model_size, language)
+        self.tuning_thread.progress.connect(
+            lambda percent: self.tuning_label.setText(f"Calibrating transcription speed... {percent}%"))
+        self.tuning_thread.finished.connect(self.on_tuning_finished)
+        self.tuning_thread.error.connect(self.on_tuning_error)
+        self.tuning_thread.start()
+
+    def on_tuning_finished(self, tuning):
+        """Save and apply calibrated settings"""
+        self.tune_btn.setEnabled(True)
+        try:
+            self.review_system.set_transcription_tuning(self.model_size, tuning)
+            self.tuningChanged.emit(tuning)
+        except Exception as e:
+            print(f"Error saving tuning: {e}")
+        self.update_tuning_label()
+
+    def on_tuning_error(self, error):
+        """Record a failed calibration, so it is not retried on its own"""
+        self.tune_btn.setEnabled(True)
+        # Settings that worked before stay in use
+        if not is_usable(self.review_system.get_transcription_tuning(self.model_size)):
+            try:
+                self.review_system.set_transcription_tuning(self.model_size, {
+                    'model_size': self.model_size,
+                    'error': error,
+                    'cpu_count': os.cpu_count(),
+                    'tuned_at': datetime.now().isoformat(timespec='seconds')
+                })
+            except Exception as e:
+                print(f"Error saving tuning: {e}")
+        self.update_tuning_label()
+        if is_usable(self.review_system.get_transcription_tuning(self.model_size)):
+            self.tuning_label.setText(self.tuning_label.text() + f"\nRecalibration failed: {error}")
+
+    def is_tuning(self) -> bool:
+        """Whether a calibration is running"""
+        return self.tuning_thread is not None and self.tuning_thread.isRunning()
+
+    def cancel_tuning(self, reason: str):
+        """Stop a running calibration whose timings would be off"""
+        if not self.is_tuning():
+            return
+        self.tuning_thread.stop()
+        self.tune_btn.setEnabled(True)
+        self.update_tuning_label()
+        self.tuning_label.setText(self.tuning_label.text() + f"\nCalibration cancelled: {reason}")
+
+    def cleanup(self):
+        """Cancel a running calibration"""
+        if self.tuning_thread is not None:
+            self.tuning_thread.stop()
+            self.tuning_thread.wait()  # Returns once the killed run is noticed
+            self.tuning_thread = None
+
     def save_settings(self):
         """Save settings and notify of changes"""
         try:
@@ -265,7 +439,8 @@ class Settings(QWidget):
                 daily_new_cards=self.new_cards_limit.value(),
                 cards_per_session=self.cards_per_session.value(),
                 learning_language=self.learning_language.currentData(),
-                native_language=self.native_language.currentData()
+                native_language=self.native_language.currentData(),
+                detect_language=self.detect_language.isChecked()
             )
             
             msg = QMessageBox()
@@ -101,6 +101,7 @@ class DropArea(QLabel):
 class UploadView(QWidget):
     uploadComplete = pyqtSignal(dict)  # Make sure this signal is defined
     uploadFailed = pyqtSignal(str)
+    uploadStarted = pyqtSignal(str)
     def __init__(self, review_system, media_processor):
         super().__init__()
         self.review_system = review_system
@@ -244,6 +245,7 @@ class UploadView(QWidget):
             
             # Start processing
             worker.start()
+            self.uploadStarted.emit(file_path)
 
         except Exception as e:
             self.handle_upload_error(str(e))
@@ -10,6 +10,7 @@ from .components.audio_card import AudioCard
 from .components.settings import Settings
 from .components.stats_view import StatsView
 from audio_processors.media_processor import MediaProcessor
+from audio_processors.tuner import is_current, is_usable
 import requests
 from pathlib import Path
 from .components.manage_view import ManageSourcesView
@@ -21,6 +22,8 @@ class ProcessingThread(QThread):
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
     progress = pyqtSignal(str)
+    segments_ready = pyqtSignal(dict, list)  # source, batch of new segments
+    percent = pyqtSignal(int)                # transcription progress
 
     def __init__(self, media_processor, url, media_type='youtube'):
         super().__init__()
@@ -45,7 +48,15 @@ class ProcessingThread(QThread):
                 return
 
             self.progress.emit("Transcribing audio...")
-            segments = self.media_processor.whisper.transcribe(result['audio_path'])
+            segments = []
+            # The worker sends segments in batches, handed to the UI as they are
+            for batch in self.media_processor.whisper.stream_batches(
+                    result['audio_path'], progress_callback=self.percent.emit):
+                if not self.is_running:
+                    return
+                segments.extend(batch)
+                self.segments_ready.emit(result, batch)
+                self.progress.emit(f"Transcribing audio... {len(segments)} segments so far")
             
             if not segments:
                 raise Exception("No segments were generated from the audio")
@@ -94,15 +105,71 @@ class MainWindow(QMainWindow):
         self.episodes_layout = None
         self.sources_list = None
         self.processing_thread = None
+        self.calibration_offered = False
         self.stats_labels = {}
 
     def initialize(self, review_system):
         self.review_system = review_system
         self.media_processor = MediaProcessor()
+        self.review_system.on_source_deleted = self.media_processor.delete_source_files
         self.setup_ui()
         self.setWindowTitle("SHIZEN")
         self.resize(1200, 800)
 
+        self.apply_transcription_language()
+
+        # Use the settings calibrated for this machine, if there are any
+        model_size = self.media_processor.whisper.config['model_size']
+        tuning = self.review_system.get_transcription_tuning(model_size)
+        if is_usable(tuning):
+            self.media_processor.whisper.apply_tuning(tuning)
+
+    def transcription_busy(self) -> bool:
+        """Whether a transcription is running or queued"""
+        if self.media_processor.whisper.busy():
+            return True
+        if self.processing_thread is not None and self.processing_thread.isRunning():
+            return True
+        upload_view = self.content_stack.widget(1)  # Index 1 is Upload view
+        return isinstance(upload_view, UploadView) and any(
+            worker.isRunning() for worker in upload_view.upload_workers)
+
+    def calibrate_if_needed(self):
+        """Offer calibration after the first transcription, the model is downloaded by then"""
+        if self.calibration_offered or self.settings_view.is_tuning():
+            return
+        model_size = self.media_processor.whisper.config['model_size']
+        if is_current(self.review_system.get_transcription_tuning(model_size)):
+            return
+        # Other transcriptions would skew the timings, ask again after them
+        if self.transcription_busy():
+            return
+        self.calibration_offered = True
+        reply = QMessageBox.question(
+            self,
+            "Calibrate Transcription",
+            "Transcription can be tuned to this computer by timing a few settings.\n"
+            "This takes a few minutes and keeps all CPU cores busy; starting another "
+            "transcription cancels it.\n\nCalibrate now?",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
+            QMessageBox.StandardButton.Yes
+        )
+        if reply == QMessageBox.StandardButton.Yes:
+            self.settings_view.start_tuning()
+
+    def cancel_calibration(self, *args):
+        """A new transcription would skew the calibration timings"""
+        self.settings_view.cancel_tuning("a transcription was started")
+
+    def apply_transcription_language(self):
+        """Transcribe in the learning language, or detect the language of each source"""
+        settings = self.review_system.get_settings()
+        language = 'auto' if settings['detect_language'] else settings['learning_language']
+        try:
+            self.media_processor.whisper.set_language(language)
+        except ValueError as e:
+            print(f"Keeping transcription language {self.media_processor.whisper.language}: {e}")
+
     def setup_ui(self):
         """Initialize the main UI"""
         central = QWidget()
@@ -127,8 +194,11 @@ class MainWindow(QMainWindow):
         self.content_stack.addWidget(self.create_manage_view())    # Index 5
         
         # Create and add settings view
-        self.settings_view = Settings(self.review_system)
+        self.settings_view = Settings(self.review_system,
+                                      model_size=self.media_processor.whisper.config['model_size'])
+        self.settings_view.settingsChanged.connect(self.apply_transcription_language)
         self.settings_view.settingsChanged.connect(self.refresh_all_views)
+        self.settings_view.tuningChanged.connect(self.media_processor.whisper.apply_tuning)
         self.content_stack.addWidget(self.settings_view)           # Index 6
 
         main_layout.addWidget(self.content_stack)
@@ -367,7 +437,7 @@ class MainWindow(QMainWindow):
         try:
             from .components.focus_mode import FocusModeDialog
             
-            if not self.review_system.items:
+            if not self.review_system.cards:
                 QMessageBox.warning(
                     self,
                     "No Content",
@@ -394,6 +464,7 @@ class MainWindow(QMainWindow):
         print("Connecting upload signals")  # Debug print
         upload_view.uploadComplete.connect(self.handle_upload_complete)
         upload_view.uploadFailed.connect(self.handle_upload_error)
+        upload_view.uploadStarted.connect(self.cancel_calibration)
         return upload_view
 
     def handle_upload_complete(self, result: dict):
@@ -401,6 +472,7 @@ class MainWindow(QMainWindow):
         try:
             # Add to review system
             self.review_system.add_source(result, result.get('segments', []))
+            self.review_system.save_words(result['audio_path'])
             
             # Show success message
             QMessageBox.information(
@@ -416,6 +488,7 @@ class MainWindow(QMainWindow):
             # Force complete refresh of the review view
             self.refresh_all_views()
             QApplication.processEvents()
+            self.calibrate_if_needed()
 
         except Exception as e:
             self.handle_upload_error(str(e))
@@ -730,7 +803,11 @@ class MainWindow(QMainWindow):
             self.processing_thread.finished.connect(self.handle_processing_finished)
             self.processing_thread.error.connect(self.handle_processing_error)
             self.processing_thread.progress.connect(self.youtube_status.setText)
+            self.processing_thread.segments_ready.connect(self.handle_segments_ready)
+            self.processing_thread.percent.connect(
+                lambda value: self.show_percent(self.youtube_progress, value))
             self.processing_thread.start()
+            self.cancel_calibration()
 
     def search_podcasts(self):
         """Search for podcasts"""
@@ -840,15 +917,33 @@ class MainWindow(QMainWindow):
             self.processing_thread.finished.connect(self.handle_processing_finished)
             self.processing_thread.error.connect(self.handle_processing_error)
             self.processing_thread.progress.connect(self.podcast_status.setText)
+            self.processing_thread.segments_ready.connect(self.handle_segments_ready)
+            self.processing_thread.percent.connect(
+                lambda value: self.show_percent(self.podcast_progress, value))
             self.processing_thread.start()
+            self.cancel_calibration()
         except Exception as e:
             self.podcast_progress.setVisible(False)
             self.podcast_status.setText(f"Error: {str(e)}")
 
+    def show_percent(self, progress_bar: QProgressBar, value: int):
+        """Switch a progress bar to percentages and show `value`"""
+        progress_bar.setRange(0, 100)
+        progress_bar.setValue(value)
+
+    def handle_segments_ready(self, source: dict, segments: list):
+        """Add a batch of freshly transcribed segments, so they can be reviewed right away"""
+        try:
+            self.review_system.add_source(source, segments)
+            self.update_stats()
+        except Exception as e:
+            print(f"Error adding segments: {str(e)}")
+
     def handle_processing_finished(self, data):
         """Handle successful processing"""
         try:
-            self.review_system.add_source(data['source'], data['segments'])
+            # Segments were already added in batches by handle_segments_ready
+            self.review_system.save_words(data['source']['audio_path'])
             self.update_stats()
             self.load_due_cards()
             
@@ -867,6 +962,7 @@ class MainWindow(QMainWindow):
                 
             QMessageBox.information(self, "Success", msg)
             self.switch_view("Review")
+            self.calibrate_if_needed()
             
         except Exception as e:
             self.handle_processing_error(f"Error finalizing processing: {str(e)}")
@@ -1141,33 +1237,47 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         """Handle application closure"""
         try:
-            # End the review session
-            self.review_system.end_session()
-            
-            # Clean up upload view workers
+            # Tell the processing threads to stop before their transcriptions are failed
+            processing_thread = getattr(self, 'processing_thread', None)
+            if processing_thread is not None:
+                processing_thread.stop()
             upload_view = self.content_stack.widget(1)  # Index 1 is Upload view
+            if isinstance(upload_view, UploadView):
+                for worker in upload_view.upload_workers:
+                    worker.stop()
+
+            # Stop the transcription worker, so threads waiting on it return
+            if hasattr(self, 'media_processor'):
+                self.media_processor.whisper.close()
+
+            # Cancel a running calibration
+            if self.settings_view is not None:
+                self.settings_view.cleanup()
+            
+            # Wait for the upload workers and the processing thread
             if isinstance(upload_view, UploadView):
                 upload_view.cleanup()
+            if processing_thread is not None:
+                processing_thread.quit()
+                processing_thread.wait()
+                self.processing_thread = None
             
             # Clean up any playing audio
             for i in range(self.review_layout.count()):
                 item = self.review_layout.itemAt(i)
                 if item and item.widget() and isinstance(item.widget(), AudioCard):
                     item.widget().cleanup()
-            
-            # Clean up any processing threads
-            if hasattr(self, 'processing_thread') and self.processing_thread is not None:
-                self.processing_thread.quit()
-                self.processing_thread.wait()
-                self.processing_thread = None
 
             # Clean up media processor
             if hasattr(self, 'media_processor'):
-                if hasattr(self.media_processor.whisper, 'model'):
-                    del self.media_processor.whisper.model
                 del self.media_processor
-
-            event.accept()
         except Exception as e:
             print(f"Error during cleanup: {e}")
-            event.accept()
\ No newline at end of file
+
+        try:
+            # Nothing writes to the review system anymore: end the session and write out pending changes
+            self.review_system.end_session()
+            self.review_system.close()
+        except Exception as e:
+            print(f"Error closing review system: {e}")
+        event.accept()
\ No newline at end of file